@@ -1,41 +1,112 @@
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import time
 from contextlib import asynccontextmanager
-from datetime import datetime, timezone
-from typing import Final, Annotated
+from datetime import datetime, timedelta, timezone
+from typing import Final, Annotated, Literal
 
 import uvicorn
-from bittensor.core.settings import SS58_FORMAT
-from decouple import config
-from fastapi import FastAPI, Depends, status
+from decouple import Csv, config
+from fastapi import FastAPI, Depends, Header, Request, WebSocket, WebSocketDisconnect, status
 from fastapi import Query
-from fastapi.responses import JSONResponse
-from pydantic import AfterValidator, BaseModel, EmailStr
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from pydantic import AfterValidator, BaseModel, EmailStr, Field, ValidationError
 from scalecodec import is_valid_ss58_address
 from sqlalchemy.exc import IntegrityError
 
-from api.auth import authorize
-from db.db import init_db, create_user
-from services.bittensor import Bittensor
-from tasks.task import background_task
+from api.auth import authorize, token_validator
+from db.db import create_user, get_dividend_history
+from services.bittensor import SS58_FORMAT, DividendLookup, bittensor_from_config, chain_deadline
+from services import metrics
+from services.block_refresher import BlockRefresher
+from services.dividend_stream import DividendStream, Subscription
+from services.rate_limiter import RateLimiter
+from services.trade_scheduler import TradeScheduler
+from tasks.client import enqueue_background_task
+
+logger = logging.getLogger(__name__)
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    await init_db()
+    await bittensor.connect()
+    if config('AUTH_CACHE_REDIS', cast=bool, default=True):
+        token_validator.redis = bittensor.cache.redis
+    trade_scheduler.redis = bittensor.cache.redis
+    rate_limiter.redis = bittensor.cache.redis
+
+    background = [asyncio.create_task(dividend_stream.run())]
+    if config('PREFETCH_ON_STARTUP', cast=bool, default=True):
+        background.append(asyncio.create_task(bittensor.prefetch_subnets(prefetch_netuids)))
+    if block_refresher is not None:
+        background.append(asyncio.create_task(block_refresher.run()))
+
     yield
 
+    for task in background:
+        task.cancel()
+    await asyncio.gather(*background, return_exceptions=True)
+    await bittensor.close()
+
 
 app = FastAPI(lifespan=lifespan)
 
+
+@app.middleware("http")
+async def record_latency(request: Request, call_next):
+    start = time.monotonic()
+    response = await call_next(request)
+    route = request.scope.get("route")
+    metrics.REQUEST_LATENCY.labels(route.path if route is not None else "unmatched", request.method,
+                                   response.status_code).observe(time.monotonic() - start)
+    return response
+
+
 default_netuid: Final = config('DEFAULT_NETUID', cast=int)
 default_hotkey: Final = config('DEFAULT_HOTKEY')
+prefetch_netuids: Final = list(dict.fromkeys([default_netuid, *config('PREFETCH_NETUIDS', cast=Csv(int), default='')]))
+batch_max_items: Final = config('DIVIDENDS_BATCH_MAX_ITEMS', cast=int, default=500)
+chain_request_timeout: Final = config('CHAIN_REQUEST_TIMEOUT', cast=float, default=10)
+cache_control_public: Final = config('CACHE_CONTROL_PUBLIC', cast=bool, default=False)
+history_max_points: Final = config('HISTORY_MAX_POINTS', cast=int, default=1000)
+
+chain_urls: Final = config('CHAIN_URL', cast=Csv())
 
-bittensor = Bittensor(
-    config('CHAIN_URL'),
-    config('REDIS_HOST'),
-    config('REDIS_TTL', cast=int),
-    config('CHAIN_MAX_CONCURRENT', cast=int),
-    config('MAX_RETRIES', cast=int)
+bittensor = bittensor_from_config(track_hot_keys=config('BLOCK_REFRESH_ENABLED', cast=bool, default=True))
+
+block_refresher = BlockRefresher(
+    bittensor,
+    chain_urls,
+    config('BLOCK_REFRESH_MAX_KEYS', cast=int, default=200),
+    config('HOT_KEY_WINDOW', cast=int, default=600),
+    max_watched_keys=config('STREAM_MAX_WATCHED_KEYS', cast=int, default=5000),
+) if config('BLOCK_REFRESH_ENABLED', cast=bool, default=True) else None
+
+trade_scheduler = TradeScheduler(config('TRADE_COALESCE_WINDOW', cast=int, default=60),
+                                 config('TRADE_PENDING_TTL', cast=int, default=3600))
+
+dividend_stream = DividendStream(
+    bittensor,
+    config('STREAM_MAX_KEYS', cast=int, default=100),
+    config('STREAM_WATCH_TTL', cast=int, default=30),
 )
+stream_keepalive: Final = config('STREAM_KEEPALIVE', cast=float, default=15)
+
+rate_limiter = RateLimiter(
+    config('RATE_LIMIT_PER_SECOND', cast=float, default=10),
+    config('RATE_LIMIT_BURST', cast=int, default=50),
+)
+shed_queue_depth: Final = config('SHED_QUEUE_DEPTH', cast=int, default=100)
+shed_queue_delay: Final = config('SHED_QUEUE_DELAY', cast=float, default=2)
+
+
+async def request_deadline():
+    """Give up chain lookups made for the current request after CHAIN_REQUEST_TIMEOUT seconds."""
+    if chain_request_timeout:
+        chain_deadline.set(time.monotonic() + chain_request_timeout)
 
 
 def validate_hotkey(value: str) -> str:
@@ -45,17 +116,64 @@ def validate_hotkey(value: str) -> str:
     raise ValueError("hotkey must be a valid SS58 formatted address")
 
 
-@app.get("/api/v1/tao_dividends", dependencies=[Depends(authorize)])
+async def admit(token: str, cost: int = 1) -> JSONResponse | None:
+    """Admit requests that have to query the chain.
+
+    Requests are shed while the chain queue is longer than SHED_QUEUE_DEPTH or its oldest
+    query has waited for more than SHED_QUEUE_DELAY seconds, and otherwise limited per
+    token. Cache hits are served without being admitted.
+
+    Args:
+        token: Bearer token of the client
+        cost: Number of chain lookups needed
+
+    Returns:
+        None if admitted, else a 429 response telling when to retry
+    """
+    queue_delay = bittensor.chain.queue_delay()
+    if (shed_queue_depth and bittensor.chain.queue_depth() >= shed_queue_depth) or \
+            (shed_queue_delay and queue_delay >= shed_queue_delay):
+        metrics.REQUESTS_REJECTED.labels("shed").inc()
+        return too_many_requests("Chain capacity exceeded", max(queue_delay, 1))
+
+    retry_after = await rate_limiter.acquire(token, cost)
+    if retry_after:
+        metrics.REQUESTS_REJECTED.labels("rate_limited").inc()
+        return too_many_requests("Rate limit exceeded", retry_after)
+
+    return None
+
+
+def too_many_requests(error: str, retry_after: float) -> JSONResponse:
+    retry_after = math.ceil(retry_after)
+    return JSONResponse(
+        status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+        headers={"Retry-After": str(retry_after)},
+        content={
+            "error": error,
+            "retry_after": retry_after,
+        }
+    )
+
+
+@app.get("/api/v1/tao_dividends", dependencies=[Depends(request_deadline)])
 async def get_dividends(
+        response: Response,
+        token: Annotated[str, Depends(authorize)],
         netuid: Annotated[int, Query(ge=0)] = default_netuid,
         hotkey: Annotated[str, AfterValidator(validate_hotkey)] = default_hotkey,
         trade: bool = False,
+        if_none_match: Annotated[str | None, Header()] = None,
 ):
-    if trade:
-        background_task.delay(netuid, hotkey)
+    trade_status = await schedule_trade(netuid, hotkey) if trade else None
 
     try:
-        dividend, cached = await bittensor.get_dividend(netuid, hotkey)
+        lookup = await bittensor.lookup_cached(netuid, hotkey)
+        if lookup is None:
+            rejection = await admit(token)
+            if rejection is not None:
+                return rejection
+            lookup = await bittensor.lookup_uncached(netuid, hotkey)
     except Exception as e:
         return JSONResponse(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
@@ -64,7 +182,7 @@ async def get_dividends(
             }
         )
 
-    if dividend is None:
+    if lookup.dividend is None:
         return JSONResponse(
             status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
             content={
@@ -74,16 +192,266 @@ async def get_dividends(
             }
         )
 
+    if trade:
+        # Triggers a trade, must reach the API every time.
+        response.headers["Cache-Control"] = "no-store"
+    else:
+        etag = dividend_etag(netuid, hotkey, lookup)
+        headers = {"ETag": etag, "Cache-Control": cache_control(lookup)}
+        if lookup.block is not None:
+            headers["X-Block"] = str(lookup.block)
+        if etag_matches(etag, if_none_match):
+            return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+        response.headers.update(headers)
+
     return {
         "timestamp": datetime.now(timezone.utc),
         "netuid": netuid,
         "hotkey": hotkey,
-        "dividend": dividend,
-        "cached": cached,
-        "stake_tx_triggered": trade
+        "dividend": lookup.dividend,
+        "cached": lookup.cached,
+        "stale": lookup.stale,
+        "age": lookup.age,
+        "block": lookup.block,
+        "stake_tx_triggered": trade,
+        "stake_tx_status": trade_status,
     }
 
 
+def dividend_etag(netuid: int, hotkey: str, lookup: DividendLookup) -> str:
+    """Weak ETag of a dividend value.
+
+    Only the value is hashed, so the tag stays the same across blocks that do not change it,
+    and it is weak as the body also carries its read time and age. The block the value was
+    read at is sent separately in the `X-Block` header.
+    """
+    digest = hashlib.sha256(f"{netuid}:{hotkey}:{lookup.dividend}".encode()).hexdigest()[:16]
+    return f'W/"{digest}"'
+
+
+def etag_matches(etag: str, if_none_match: str | None) -> bool:
+    """Whether an `If-None-Match` header matches the ETag, using the weak comparison it calls for."""
+    if if_none_match is None:
+        return False
+
+    tags = [tag.strip().removeprefix("W/") for tag in if_none_match.split(",")]
+    return "*" in tags or etag.removeprefix("W/") in tags
+
+
+def cache_control(lookup: DividendLookup) -> str:
+    """`Cache-Control` header letting clients reuse a value for as long as it stays fresh in the cache."""
+    if lookup.stale or (lookup.cached and lookup.age is None):
+        max_age = 0
+    elif lookup.cached:
+        max_age = max(int(bittensor.redis_ttl - lookup.age), 0)
+    else:
+        max_age = bittensor.redis_ttl
+
+    return f"{'public' if cache_control_public else 'private'}, max-age={max_age}"
+
+
+async def schedule_trade(netuid: int, hotkey: str) -> str:
+    """Schedule a trade, or join the one already scheduled for the netuid and hotkey.
+
+    Returns:
+        "scheduled" or "joined"
+    """
+    try:
+        scheduled = await trade_scheduler.schedule(netuid, hotkey, enqueue_background_task)
+    except Exception as e:
+        logger.error(f"Failed to coalesce trade, scheduling it directly: {e}")
+        enqueue_background_task(netuid, hotkey)
+        scheduled = True
+
+    return "scheduled" if scheduled else "joined"
+
+
+class DividendKey(BaseModel):
+    netuid: Annotated[int, Field(ge=0)]
+    hotkey: Annotated[str, AfterValidator(validate_hotkey)]
+
+
+class BatchDividendsRequest(BaseModel):
+    items: Annotated[list[DividendKey], Field(min_length=1, max_length=batch_max_items)]
+
+
+@app.post("/api/v1/tao_dividends/batch", dependencies=[Depends(request_deadline)])
+async def get_dividends_batch(data: BatchDividendsRequest, token: Annotated[str, Depends(authorize)]):
+    keys = list(dict.fromkeys((item.netuid, item.hotkey) for item in data.items))
+    try:
+        results = await bittensor.get_cached_dividends(keys)
+        missing = [key for key in keys if key not in results]
+        if missing:
+            rejection = await admit(token, len(missing))
+            if rejection is not None:
+                return rejection
+            results.update(await bittensor.get_uncached_dividends(missing))
+    except Exception as e:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "error": f"{e}",
+            }
+        )
+
+    items = []
+    for item in data.items:
+        lookup = results[(item.netuid, item.hotkey)]
+        items.append({
+            "netuid": item.netuid,
+            "hotkey": item.hotkey,
+            "dividend": lookup.dividend,
+            "cached": lookup.cached,
+            "stale": lookup.stale,
+            "age": lookup.age,
+            "block": lookup.block,
+            "error": None if lookup.dividend is not None else "Failed to connect to Bittensor API.",
+        })
+
+    return {
+        "timestamp": datetime.now(timezone.utc),
+        "items": items,
+    }
+
+
+@app.get("/api/v1/tao_dividends/history", dependencies=[Depends(authorize)])
+async def get_dividend_history_range(
+        netuid: Annotated[int, Query(ge=0)] = default_netuid,
+        hotkey: Annotated[str, AfterValidator(validate_hotkey)] = default_hotkey,
+        start: datetime | None = None,
+        end: datetime | None = None,
+        points: Annotated[int, Query(ge=1, le=history_max_points)] = 200,
+):
+    """Recorded dividends of a hotkey from `start` until `end` (default: the last 24 hours).
+
+    The range is downsampled to at most `points` intervals, each summarised by the average,
+    minimum and maximum of the values recorded in it and its last block. Datetimes without
+    a timezone are taken as UTC.
+    """
+    end = as_utc(end) if end is not None else datetime.now(timezone.utc)
+    start = as_utc(start) if start is not None else end - timedelta(days=1)
+    if start >= end:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": "start must be before end",
+            }
+        )
+
+    try:
+        interval, history = await get_dividend_history(netuid, hotkey, start, end, points)
+    except Exception as e:
+        return JSONResponse(
+            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
+            content={
+                "error": f"{e}",
+            }
+        )
+
+    return {
+        "netuid": netuid,
+        "hotkey": hotkey,
+        "start": start,
+        "end": end,
+        "interval": interval,
+        "points": history,
+    }
+
+
+def as_utc(value: datetime) -> datetime:
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value.astimezone(timezone.utc)
+
+
+def validate_stream_key(value: str) -> tuple[int, str]:
+    netuid, _, hotkey = value.partition(":")
+    if not netuid.isdigit():
+        raise ValueError("key must be formatted as netuid:hotkey")
+
+    return int(netuid), validate_hotkey(hotkey)
+
+
+@app.get("/api/v1/tao_dividends/stream", dependencies=[Depends(authorize)])
+async def stream_dividends(
+        key: Annotated[list[Annotated[str, AfterValidator(validate_stream_key)]], Query(min_length=1)],
+):
+    """Stream dividend updates of `netuid:hotkey` keys as server-sent events.
+
+    The current values are sent first, then every changed value once per block.
+    """
+    if len(set(key)) > dividend_stream.max_keys:
+        return JSONResponse(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            content={
+                "error": f"At most {dividend_stream.max_keys} keys can be subscribed to",
+            }
+        )
+
+    async def events():
+        subscription = dividend_stream.subscribe()
+        try:
+            await dividend_stream.add(subscription, key)
+            while True:
+                items = await subscription.next(stream_keepalive)
+                # A comment keeps idle connections from being closed by proxies.
+                yield f"data: {json.dumps({'items': items})}\n\n" if items else ": keepalive\n\n"
+        finally:
+            dividend_stream.close(subscription)
+
+    return StreamingResponse(events(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+class StreamRequest(BaseModel):
+    action: Literal["subscribe", "unsubscribe"]
+    items: Annotated[list[DividendKey], Field(min_length=1)]
+
+
+@app.websocket("/api/v1/tao_dividends/ws")
+async def stream_dividends_ws(websocket: WebSocket, token: str | None = None):
+    """Stream dividend updates over a WebSocket.
+
+    Clients authenticate with a bearer token in the `Authorization` header or the `token`
+    query parameter, then send `{"action": "subscribe" | "unsubscribe", "items": [{"netuid",
+    "hotkey"}]}` messages. Current values of subscribed keys are sent first, then every
+    changed value once per block, as `{"items": [...]}` messages.
+    """
+    scheme, _, credentials = websocket.headers.get("authorization", "").partition(" ")
+    token = credentials if scheme.lower() == "bearer" else token
+    if not token or not await token_validator.is_valid(token):
+        await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
+        return
+
+    await websocket.accept()
+    subscription = dividend_stream.subscribe()
+    sender = asyncio.create_task(send_updates(websocket, subscription))
+    try:
+        while True:
+            message = await websocket.receive_text()
+            try:
+                request = StreamRequest.model_validate_json(message)
+                keys = [(item.netuid, item.hotkey) for item in request.items]
+                if request.action == "subscribe":
+                    await dividend_stream.add(subscription, keys)
+                else:
+                    dividend_stream.remove(subscription, keys)
+            except ValidationError as e:
+                await websocket.send_json({"error": "Invalid request", "details": json.loads(e.json())})
+            except ValueError as e:
+                await websocket.send_json({"error": f"{e}"})
+    except WebSocketDisconnect:
+        pass
+    finally:
+        sender.cancel()
+        await asyncio.gather(sender, return_exceptions=True)
+        dividend_stream.close(subscription)
+
+
+async def send_updates(websocket: WebSocket, subscription: Subscription):
+    while True:
+        items = await subscription.next()
+        await websocket.send_json({"items": items})
+
+
 class SignupRequest(BaseModel):
     email: EmailStr
 
@@ -92,6 +460,7 @@ class SignupRequest(BaseModel):
 async def signup(data: SignupRequest):
     try:
         token = await create_user(str(data.email))
+        await token_validator.invalidate(token)
         return JSONResponse(
             status_code=status.HTTP_201_CREATED,
             content={
@@ -107,6 +476,12 @@ async def signup(data: SignupRequest):
         )
 
 
+@app.get("/metrics", include_in_schema=False)
+async def get_metrics():
+    content, media_type = metrics.render()
+    return Response(content, media_type=media_type)
+
+
 async def start_web_server():
     """
     Starts the FastAPI server using Uvicorn within an asyncio coroutine.
@@ -1,16 +1,102 @@
+import hashlib
+import logging
+
+import aioredis
+from decouple import config
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 
 from db.db import is_valid_token
+from services.local_cache import LocalCache
+from services.metrics import AUTH_DB_LATENCY
+from services.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
 
 # Define Bearer token security scheme
 auth_scheme = HTTPBearer()
 
 
+class TokenValidator:
+    """Caches bearer token validation results so requests don't hit the database.
+
+    Results are kept in a bounded in-process LRU cache and, when `redis` is set, shared
+    between processes through Redis under a hash of the token. Valid tokens are cached for
+    `ttl` seconds, invalid ones for `negative_ttl` seconds. Concurrent lookups of the same
+    token share a single database query.
+    """
+
+    REDIS_PREFIX = "auth:token:"
+
+    def __init__(self, ttl: int, negative_ttl: int, max_entries: int):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.local = LocalCache(max_entries, ttl)
+        self.redis: aioredis.Redis | None = None
+        self.single_flight = SingleFlight()
+
+    async def is_valid(self, token: str) -> bool:
+        valid = self.local.get(token)
+        if valid is not None:
+            return valid
+
+        return await self.single_flight.do(token, lambda: self._validate(token))
+
+    async def invalidate(self, token: str):
+        """Drop a cached result, e.g. after the token was created or revoked.
+
+        Other processes still serve their in-process result for up to `ttl` seconds.
+        """
+        self.local.invalidate(token)
+        if self.redis is not None:
+            try:
+                await self.redis.delete(self._redis_key(token))
+            except Exception as e:
+                logger.error(f"Failed to invalidate token cache: {e}")
+
+    async def _validate(self, token: str) -> bool:
+        if self.redis is not None:
+            try:
+                cached = await self.redis.get(self._redis_key(token))
+            except Exception as e:
+                logger.error(f"Failed to read token cache: {e}")
+                cached = None
+
+            if cached is not None:
+                valid = cached == "1"
+                self._remember(token, valid)
+                return valid
+
+        with AUTH_DB_LATENCY.time():
+            valid = await is_valid_token(token)
+        self._remember(token, valid)
+        if self.redis is not None:
+            try:
+                await self.redis.set(self._redis_key(token), "1" if valid else "0",
+                                     ex=self.ttl if valid else self.negative_ttl)
+            except Exception as e:
+                logger.error(f"Failed to write token cache: {e}")
+
+        return valid
+
+    def _remember(self, token: str, valid: bool):
+        self.local.set(token, valid, self.ttl if valid else self.negative_ttl)
+
+    def _redis_key(self, token: str) -> str:
+        return self.REDIS_PREFIX + hashlib.sha256(token.encode()).hexdigest()
+
+
+token_validator = TokenValidator(
+    config('AUTH_CACHE_TTL', cast=int, default=60),
+    config('AUTH_CACHE_NEGATIVE_TTL', cast=int, default=10),
+    config('AUTH_CACHE_SIZE', cast=int, default=10000),
+)
+
+
 # Dependency to validate authorization
 async def authorize(credentials: HTTPAuthorizationCredentials = Depends(auth_scheme)):
     token = credentials.credentials
-    valid = await is_valid_token(token)
+    valid = await token_validator.is_valid(token)
 
     if not valid:  # Replace with proper token validation logic
         raise HTTPException(
@@ -0,0 +1,397 @@
+import asyncio
+import hashlib
+import json
+import random
+import re
+import time
+import uuid
+from dataclasses import dataclass
+from typing import Any
+
+from aiohttp import web
+
+
+@dataclass
+class LatencyProfile:
+    """Simulated latency of a dependency: log-normally distributed around `mean` seconds,
+    with a share of `error_rate` calls failing."""
+
+    mean: float
+    error_rate: float = 0.0
+    sigma: float = 0.5
+
+    def sample(self, rng: random.Random) -> float:
+        return rng.lognormvariate(0, self.sigma) * self.mean
+
+    def fails(self, rng: random.Random) -> bool:
+        return rng.random() < self.error_rate
+
+
+class FakeRedis:
+    """In-process stand-in for the subset of the aioredis client used by the services.
+
+    Values are kept as strings (as with `decode_responses=True`) and expire like in Redis.
+    """
+
+    def __init__(self):
+        self._data: dict[str, Any] = {}
+        self._expires: dict[str, float] = {}
+        self._subscribers: dict[str, list[asyncio.Queue]] = {}
+        self.connection_pool = self
+        self.commands = 0
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+    async def disconnect(self):
+        pass
+
+    async def get(self, key: str) -> str | None:
+        self.commands += 1
+        return self._get(key)
+
+    async def mget(self, keys: list[str]) -> list[str | None]:
+        self.commands += 1
+        return [self._get(key) for key in keys]
+
+    async def set(self, key: str, value: Any, ex: float | None = None, nx: bool = False) -> bool | None:
+        self.commands += 1
+        return self._set(key, value, ex, nx)
+
+    async def delete(self, *keys: str) -> int:
+        self.commands += 1
+        return self._delete(*keys)
+
+    async def exists(self, *keys: str) -> int:
+        self.commands += 1
+        return self._exists(*keys)
+
+    async def publish(self, channel: str, message: str) -> int:
+        self.commands += 1
+        return self._publish(channel, message)
+
+    async def hget(self, name: str, key: str) -> str | None:
+        self.commands += 1
+        return self._hget(name, key)
+
+    async def hgetall(self, name: str) -> dict[str, str]:
+        self.commands += 1
+        return dict(self._live(name, {}))
+
+    async def zrevrange(self, name: str, start: int, end: int) -> list[str]:
+        self.commands += 1
+        members = sorted(self._live(name, {}).items(), key=lambda item: item[1], reverse=True)
+        return [member for member, _ in members[start:end + 1 if end >= 0 else None]]
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def pubsub(self, ignore_subscribe_messages: bool = False) -> "FakePubSub":
+        return FakePubSub(self)
+
+    def lock(self, name: str, timeout: float | None = None) -> "FakeLock":
+        return FakeLock(self, name, timeout)
+
+    def _live(self, key: str, default: Any = None) -> Any:
+        expires = self._expires.get(key)
+        if expires is not None and expires <= time.monotonic():
+            self._delete(key)
+        return self._data.get(key, default)
+
+    def _get(self, key: str) -> str | None:
+        return self._live(key)
+
+    def _set(self, key: str, value: Any, ex: float | None = None, nx: bool = False) -> bool | None:
+        if nx and self._live(key) is not None:
+            return None
+        self._data[key] = str(value)
+        self._expire(key, ex)
+        return True
+
+    def _delete(self, *keys: str) -> int:
+        deleted = 0
+        for key in keys:
+            self._expires.pop(key, None)
+            deleted += self._data.pop(key, None) is not None
+        return deleted
+
+    def _exists(self, *keys: str) -> int:
+        return sum(self._live(key) is not None for key in keys)
+
+    def _expire(self, key: str, seconds: float | None) -> bool:
+        if seconds is None:
+            self._expires.pop(key, None)
+        else:
+            self._expires[key] = time.monotonic() + seconds
+        return key in self._data
+
+    def _publish(self, channel: str, message: str) -> int:
+        subscribers = self._subscribers.get(channel, [])
+        for queue in subscribers:
+            queue.put_nowait({"type": "message", "channel": channel, "data": message})
+        return len(subscribers)
+
+    def _zadd(self, name: str, mapping: dict[str, float]) -> int:
+        zset = self._live(name)
+        if zset is None:
+            zset = self._data[name] = {}
+        added = sum(member not in zset for member in mapping)
+        zset.update(mapping)
+        return added
+
+    def _zremrangebyscore(self, name: str, low: Any, high: Any) -> int:
+        zset = self._live(name, {})
+        low, high = float(low), float(high)
+        removed = [member for member, score in zset.items() if low <= score <= high]
+        for member in removed:
+            del zset[member]
+        return len(removed)
+
+    def _hget(self, name: str, key: str) -> str | None:
+        return self._live(name, {}).get(key)
+
+    def _hmget(self, name: str, keys: list[str]) -> list[str | None]:
+        fields = self._live(name, {})
+        return [fields.get(key) for key in keys]
+
+    def _hset(self, name: str, key: str | None = None, value: Any = None, mapping: dict | None = None) -> int:
+        fields = self._live(name)
+        if fields is None:
+            fields = self._data[name] = {}
+        values = {**({key: value} if key is not None else {}), **(mapping or {})}
+        added = sum(field not in fields for field in values)
+        fields.update({field: str(value) for field, value in values.items()})
+        return added
+
+    def _sadd(self, name: str, *values: str) -> int:
+        members = self._live(name)
+        if members is None:
+            members = self._data[name] = set()
+        added = sum(value not in members for value in values)
+        members.update(values)
+        return added
+
+    def _smembers(self, name: str) -> "set[str]":
+        return set(self._live(name, set()))
+
+
+class FakePipeline:
+    """Buffers commands and runs them in order on `execute`, like a Redis pipeline."""
+
+    COMMANDS = {
+        "get": "_get", "set": "_set", "delete": "_delete", "exists": "_exists", "expire": "_expire",
+        "publish": "_publish", "zadd": "_zadd", "zremrangebyscore": "_zremrangebyscore", "sadd": "_sadd",
+        "smembers": "_smembers", "hget": "_hget", "hmget": "_hmget", "hset": "_hset",
+    }
+
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self._commands: list[tuple[str, tuple, dict]] = []
+
+    async def __aenter__(self) -> "FakePipeline":
+        return self
+
+    async def __aexit__(self, *exc):
+        self._commands.clear()
+
+    def __getattr__(self, name: str):
+        if name not in self.COMMANDS:
+            raise AttributeError(name)
+
+        def command(*args, **kwargs) -> "FakePipeline":
+            self._commands.append((self.COMMANDS[name], args, kwargs))
+            return self
+
+        return command
+
+    async def execute(self) -> list[Any]:
+        self.redis.commands += 1
+        commands, self._commands = self._commands, []
+        return [getattr(self.redis, method)(*args, **kwargs) for method, args, kwargs in commands]
+
+
+class FakePubSub:
+    def __init__(self, redis: FakeRedis):
+        self.redis = redis
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._channels: list[str] = []
+
+    async def subscribe(self, *channels: str):
+        for channel in channels:
+            self.redis._subscribers.setdefault(channel, []).append(self._queue)
+            self._channels.append(channel)
+
+    async def unsubscribe(self, *channels: str):
+        for channel in channels or list(self._channels):
+            self.redis._subscribers.get(channel, []).remove(self._queue)
+            self._channels.remove(channel)
+
+    async def listen(self):
+        while True:
+            yield await self._queue.get()
+
+    async def close(self):
+        if self._channels:
+            await self.unsubscribe()
+
+
+class FakeLock:
+    def __init__(self, redis: FakeRedis, name: str, timeout: float | None):
+        self.redis = redis
+        self.name = name
+        self.timeout = timeout
+        self.token = uuid.uuid4().hex
+
+    async def acquire(self, blocking: bool = True) -> bool:
+        return bool(self.redis._set(self.name, self.token, ex=self.timeout, nx=True))
+
+    async def reacquire(self) -> bool:
+        return self.redis._expire(self.name, self.timeout)
+
+    async def release(self):
+        if self.redis._get(self.name) == self.token:
+            self.redis._delete(self.name)
+
+
+class FakeSubstrate:
+    """Stand-in for `AsyncSubstrateInterface` answering dividend queries with simulated latency."""
+
+    def __init__(self, url: str, profile: LatencyProfile, rng: random.Random):
+        self.url = url
+        self.profile = profile
+        self.rng = rng
+        self.ws = type("FakeWebsocket", (), {"shutdown_timer": None})()
+        self.queries = 0
+
+    async def initialize(self):
+        await self._respond()
+
+    async def close(self):
+        pass
+
+    async def get_chain_head(self) -> str:
+        await self._respond()
+        return "0x00"
+
+    async def get_block_hash(self, block: int) -> str:
+        await self._respond()
+        return f"0x{block:064x}"
+
+    async def query(self, module: str, storage: str, params: list) -> Any:
+        await self._respond()
+        return type("ScaleObj", (), {"value": dividend_for(*params)})()
+
+    async def create_storage_key(self, pallet: str, storage: str, params: list) -> Any:
+        key = "0x" + hashlib.sha256(json.dumps(params).encode()).hexdigest()
+        return type("StorageKey", (), {"to_hex": lambda _: key, "params": params})()
+
+    async def query_multi(self, storage_keys: list, block_hash: str | None = None) -> list:
+        await self._respond()
+        return [(key, dividend_for(*key.params)) for key in storage_keys]
+
+    async def _respond(self):
+        self.queries += 1
+        await asyncio.sleep(self.profile.sample(self.rng))
+        if self.profile.fails(self.rng):
+            raise ConnectionError(f"Simulated failure of {self.url}")
+
+
+class FakeSubtensor:
+    """Stand-in for `AsyncSubtensor` submitting stake extrinsics with simulated latency."""
+
+    def __init__(self, profile: LatencyProfile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        self.extrinsics = 0
+
+    async def initialize(self):
+        await asyncio.sleep(self.profile.sample(self.rng))
+
+    async def close(self):
+        pass
+
+    async def add_stake(self, wallet: Any, hotkey_ss58: str, netuid: int, amount: Any) -> bool:
+        return await self._submit()
+
+    async def unstake(self, wallet: Any, hotkey_ss58: str, netuid: int, amount: Any) -> bool:
+        return await self._submit()
+
+    async def _submit(self) -> bool:
+        self.extrinsics += 1
+        await asyncio.sleep(self.profile.sample(self.rng))
+        return True
+
+
+class FakeDatura:
+    """Stand-in for the synchronous Datura client returning a fixed set of tweets."""
+
+    def __init__(self, api_key: str, profile: LatencyProfile, rng: random.Random):
+        self.api_key = api_key
+        self.profile = profile
+        self.rng = rng
+
+    def basic_twitter_search(self, query: str, count: int, **kwargs) -> list[dict]:
+        time.sleep(self.profile.sample(self.rng))
+        return [{"text": f"Tweet {i} on {query}"} for i in range(count)]
+
+
+class FakeLLMServer:
+    """Local OpenAI-compatible chat completions endpoint returning deterministic scores.
+
+    Supports streamed responses, in which case the answer is sent in several chunks.
+    """
+
+    def __init__(self, profile: LatencyProfile, rng: random.Random):
+        self.profile = profile
+        self.rng = rng
+        self.requests = 0
+        self.url: str | None = None
+        self._runner: web.AppRunner | None = None
+
+    async def start(self):
+        app = web.Application()
+        app.router.add_post("/v1/chat/completions", self._complete)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]
+        self.url = f"http://127.0.0.1:{port}/v1/chat/completions"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    async def _complete(self, request: web.Request) -> web.StreamResponse:
+        self.requests += 1
+        body = await request.json()
+        prompt = body["messages"][0]["content"]
+        count = re.search(r"For each of the (\d+) numbered tweets", prompt)
+        scores = [score_for(prompt, i) for i in range(int(count.group(1)) if count else 1)]
+        answer = json.dumps(scores) if count else f"score: {scores[0]:+d}"
+
+        await asyncio.sleep(self.profile.sample(self.rng))
+        if not body.get("stream"):
+            return web.json_response({"choices": [{"message": {"content": answer}}]})
+
+        response = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await response.prepare(request)
+        for start in range(0, len(answer), 4):
+            chunk = {"choices": [{"delta": {"content": answer[start:start + 4]}}]}
+            await response.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(self.profile.mean / 20)
+        await response.write(b"data: [DONE]\n\n")
+        return response
+
+
+def dividend_for(netuid: int, hotkey: str) -> int:
+    """Deterministic dividend value of a key."""
+    return int.from_bytes(hashlib.sha256(f"{netuid}:{hotkey}".encode()).digest()[:4], "big")
+
+
+def score_for(prompt: str, index: int) -> int:
+    """Deterministic sentiment score of the `index`-th tweet of a prompt."""
+    return int.from_bytes(hashlib.sha256(f"{prompt}:{index}".encode()).digest()[:2], "big") % 201 - 100
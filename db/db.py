@@ -1,6 +1,11 @@
+import math
 import uuid
+from datetime import datetime, timedelta
+from typing import Final
 
 from decouple import config
+from sqlalchemy import BigInteger, Column, DateTime, Index, func
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel, Field, select
@@ -9,6 +14,8 @@ from sqlmodel import SQLModel, Field, select
 engine = create_async_engine(config('DATABASE_URL'), echo=config('APP_LOG_LEVEL') == 'debug')
 async_session = sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
 
+k6_test_token: Final = config('K6_TEST_TOKEN', default='')
+
 
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
@@ -37,7 +44,7 @@ async def create_user(email: str) -> str:
 
 
 async def is_valid_token(token: str) -> bool:
-    if token == config('K6_TEST_TOKEN'):
+    if k6_test_token and token == k6_test_token:
         return True
 
     async with async_session() as session:
@@ -46,3 +53,87 @@ async def is_valid_token(token: str) -> bool:
         user = result.scalars().first()
 
         return user is not None
+
+
+class DividendSnapshot(SQLModel, table=True):
+    """Dividend of a hotkey at a block, as recorded by the `snapshot_dividends` task.
+
+    The primary key orders rows by (netuid, hotkey, block), the index by (netuid, hotkey,
+    timestamp) serves time range queries of a hotkey.
+    """
+
+    __tablename__ = "dividend_snapshot"
+    __table_args__ = (Index("ix_dividend_snapshot_netuid_hotkey_timestamp", "netuid", "hotkey", "timestamp"),)
+
+    netuid: int = Field(primary_key=True)
+    hotkey: str = Field(primary_key=True)
+    block: int = Field(primary_key=True, sa_type=BigInteger)
+    dividend: int = Field(sa_type=BigInteger)
+    timestamp: datetime = Field(sa_column=Column(DateTime(timezone=True), nullable=False))
+
+
+async def store_dividend_snapshots(snapshots: list[dict], batch_size: int = 1000) -> int:
+    """Insert snapshot rows with one multi-row INSERT per `batch_size` rows, in a single transaction.
+
+    Rows already recorded, e.g. of a block snapshotted twice, are skipped.
+
+    Args:
+        snapshots: Rows with netuid, hotkey, block, dividend and timestamp
+        batch_size: Rows per statement, at most 32767 / 5 as statements take up to 32767 parameters
+
+    Returns:
+        Number of inserted rows
+    """
+    inserted = 0
+    async with async_session() as session:
+        async with session.begin():
+            for start in range(0, len(snapshots), batch_size):
+                statement = insert(DividendSnapshot).values(snapshots[start:start + batch_size])
+                result = await session.execute(statement.on_conflict_do_nothing())
+                inserted += result.rowcount
+
+    return inserted
+
+
+async def get_dividend_history(netuid: int, hotkey: str, start: datetime, end: datetime,
+                               max_points: int) -> tuple[int, list[dict]]:
+    """Dividends of a hotkey recorded from `start` until before `end`, downsampled in the database.
+
+    The range is split into at most `max_points` intervals of whole seconds, each summarised
+    by the average, minimum and maximum of its values and its last block.
+
+    Returns:
+        Seconds per interval, and the summary of each interval holding values, ordered by time
+    """
+    interval = max(math.ceil((end - start).total_seconds() / max_points), 1)
+    bucket = func.floor(func.extract("epoch", DividendSnapshot.timestamp - start) / interval)
+    statement = (
+        select(
+            bucket.label("bucket"),
+            func.max(DividendSnapshot.block).label("block"),
+            func.avg(DividendSnapshot.dividend).label("dividend"),
+            func.min(DividendSnapshot.dividend).label("min"),
+            func.max(DividendSnapshot.dividend).label("max"),
+            func.count().label("samples"),
+        )
+        .where(DividendSnapshot.netuid == netuid, DividendSnapshot.hotkey == hotkey,
+               DividendSnapshot.timestamp >= start, DividendSnapshot.timestamp < end)
+        .group_by("bucket")
+        .order_by("bucket")
+    )
+
+    async with async_session() as session:
+        result = await session.execute(statement)
+        rows = result.all()
+
+    return interval, [
+        {
+            "timestamp": start + timedelta(seconds=int(row.bucket) * interval),
+            "block": row.block,
+            "dividend": round(row.dividend),
+            "min": row.min,
+            "max": row.max,
+            "samples": row.samples,
+        }
+        for row in rows
+    ]
@@ -0,0 +1,32 @@
+import asyncio
+import logging
+
+from db.db import engine, init_db
+
+logger = logging.getLogger(__name__)
+
+
+async def main(attempts: int = 30, delay: float = 1):
+    """Create the tables of all models that do not exist yet.
+
+    Run once per deployment before starting the API, instead of by every API process on startup.
+    Retried while the database is still starting.
+    """
+    try:
+        for attempt in range(1, attempts + 1):
+            try:
+                await init_db()
+                break
+            except Exception as e:
+                if attempt == attempts:
+                    raise
+                logger.warning(f"Database not ready ({e}), retrying in {delay}s.")
+                await asyncio.sleep(delay)
+        logger.info("Database tables created.")
+    finally:
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
@@ -1,23 +1,135 @@
 import asyncio
+import json
 import logging
+import random
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncIterator, Awaitable, Callable, Final, NamedTuple, TypeVar
 
 import aioredis
+from aioredis.client import Pipeline, Script
+from aioredis.exceptions import LockError
+from aioredis.lock import Lock
 from async_substrate_interface.async_substrate import AsyncSubstrateInterface
-from bittensor.core.settings import SS58_FORMAT
+from decouple import Csv, config
+from scalecodec import ss58_encode
+
+from services.circuit_breaker import CircuitBreaker
+from services.local_cache import LocalCache
+from services.metrics import CACHE_LOOKUPS, CHAIN_FAILURES, CHAIN_HEDGED, CHAIN_POOL_WAIT, CHAIN_POOL_WAITING, \
+    CHAIN_QUERY_LATENCY, CHAIN_RETRIES, DIVIDEND_FETCHES
+from services.single_flight import SingleFlight
 
 logger = logging.getLogger(__name__)
 
+T = TypeVar("T")
+
+# Address format of the chain, as `bittensor.core.settings.SS58_FORMAT`. Defined here since
+# importing anything from the `bittensor` SDK loads all of it, which slows down startup.
+SS58_FORMAT: Final = 42
+
+# Deletes the fields of hash KEYS[1] stored before time ARGV[1], values being formatted by
+# `encode_cached_value`, so fields no longer written do not outlive the hash's refreshed expiry.
+PRUNE_HASH_SCRIPT = """
+local cutoff = tonumber(ARGV[1])
+local fields = redis.call('HGETALL', KEYS[1])
+local expired = {}
+for i = 1, #fields, 2 do
+    local stored_at = tonumber(string.match(fields[i + 1], '^[^:]*:[^:]*:(.+)$'))
+    if stored_at and stored_at < cutoff then
+        table.insert(expired, fields[i])
+    end
+end
+for i = 1, #expired, 1000 do
+    redis.call('HDEL', KEYS[1], unpack(expired, i, math.min(i + 999, #expired)))
+end
+return #expired
+"""
+
+# `time.monotonic()` time after which chain lookups made for the current request are given up.
+chain_deadline: ContextVar[float | None] = ContextVar("chain_deadline", default=None)
+
+
+def decode_account_id(account_id: bytes | tuple) -> str:
+    """SS58 address of an AccountId returned by a storage query, as `bittensor.core.chain_data.utils`."""
+    if isinstance(account_id, tuple) and isinstance(account_id[0], tuple):
+        account_id = account_id[0]
+    return ss58_encode(bytes(account_id).hex(), SS58_FORMAT)
+
+
+class CachedDividend(NamedTuple):
+    """Dividend value as stored in the cache."""
+
+    dividend: int
+    block: int | None = None
+    stored_at: float | None = None
+
+    def age(self) -> float | None:
+        """Seconds since the value was stored, None if unknown."""
+        return time.time() - self.stored_at if self.stored_at is not None else None
+
+    def is_fresh(self, ttl: int) -> bool:
+        """Whether the value was stored less than `ttl` seconds ago, values of unknown age count as fresh."""
+        return self.stored_at is None or time.time() - self.stored_at < ttl
+
+
+class DividendLookup(NamedTuple):
+    """Result of a dividend lookup."""
+
+    dividend: int | None
+    cached: bool
+    stale: bool = False
+    block: int | None = None
+    age: float | None = None
+
 
 class Bittensor:
     """Bittensor service for handling chain interactions and caching.
     
     Provides functionality to interact with Bittensor blockchain and maintain a Redis cache
-    for dividend values.
+    for dividend values. Concurrent cache misses for the same key are coalesced into one
+    chain query per process, and, when `fetch_lock_timeout` is set, across processes through
+    a Redis lock.
+
+    Cached values are fresh for `redis_ttl` seconds and kept for `redis_stale_ttl` seconds.
+    A stale value is returned immediately, flagged as such, while it is refreshed in the
+    background; if the refresh fails it keeps being served until it expires.
     """
 
-    def __init__(self, chain_url: str, redis_url: str, redis_ttl: int, chain_max_concurrent: int, max_retries: int):
-        self.chain = ChainHandler(chain_url, chain_max_concurrent, max_retries)
-        self.cache = CacheHandler(redis_url, redis_ttl)
+    def __init__(self, chain_url: str | list[str], redis_url: str, redis_ttl: int, chain_max_concurrent: int,
+                 max_retries: int,
+                 chain_health_check_interval: int = 30, redis_max_connections: int = 50, fetch_lock_timeout: int = 0,
+                 local_cache_size: int = 0, local_cache_ttl: float = 5, local_cache_max_bytes: int = 0,
+                 track_hot_keys: bool = False, redis_stale_ttl: int = 0, chain_backoff_base: float = 0.5,
+                 chain_backoff_max: float = 5, breaker_error_threshold: float = 0.5, breaker_reset_timeout: float = 30,
+                 chain_hedge: bool = False, cache_layout: str = "keys"):
+        self.chain = ChainHandler(chain_url, chain_max_concurrent, max_retries, chain_health_check_interval,
+                                  chain_backoff_base, chain_backoff_max,
+                                  CircuitBreaker(breaker_error_threshold, breaker_reset_timeout), chain_hedge)
+        self.cache = CacheHandler(redis_url, max(redis_ttl, redis_stale_ttl), redis_max_connections,
+                                  local_cache_size=local_cache_size, local_cache_ttl=min(local_cache_ttl, redis_ttl),
+                                  local_cache_max_bytes=local_cache_max_bytes, track_hot_keys=track_hot_keys,
+                                  layout=cache_layout)
+        self.redis_ttl = redis_ttl
+        self.fetch_lock_timeout = fetch_lock_timeout
+        self.single_flight = SingleFlight(DIVIDEND_FETCHES.labels("executed"),
+                                          DIVIDEND_FETCHES.labels("coalesced_in_process"))
+        self._revalidating: set[tuple[int, str]] = set()
+        self._background: set[asyncio.Task] = set()
+
+    async def connect(self):
+        """Open long-lived connections shared by all requests."""
+        await asyncio.gather(self.chain.connect(), self.cache.connect())
+
+    async def close(self):
+        """Close connections opened by `connect`."""
+        for task in list(self._background):
+            task.cancel()
+        await asyncio.gather(*self._background, return_exceptions=True)
+        await asyncio.gather(self.chain.close(), self.cache.close())
 
     async def get_dividend(self, netuid: int, hotkey: str) -> (int | None, bool):
         """Retrieve dividend value for given netuid and hotkey with caching.
@@ -29,27 +141,233 @@ class Bittensor:
         Returns:
             Tuple of (dividend value or None, bool indicating if value was from cache)
         """
-        dividend = await self.cache.get_dividend(netuid, hotkey)
-        if dividend is not None:
-            return dividend, True
+        lookup = await self.lookup_dividend(netuid, hotkey)
+        return lookup.dividend, lookup.cached
+
+    async def lookup_dividend(self, netuid: int, hotkey: str) -> DividendLookup:
+        """Retrieve dividend value for given netuid and hotkey with caching, see `get_dividend`.
+        
+        A chain fetch shared by concurrent callers runs until the `chain_deadline` of the
+        first caller, later callers stop waiting for it at their own deadline.
+        
+        Args:
+            netuid: Network subnet ID
+            hotkey: Wallet hotkey address
+            
+        Returns:
+            Dividend value with its cache status, staleness, block and age when known
+        """
+        lookup = await self.lookup_cached(netuid, hotkey)
+        if lookup is not None:
+            return lookup
+
+        return await self.lookup_uncached(netuid, hotkey)
+
+    async def lookup_cached(self, netuid: int, hotkey: str) -> DividendLookup | None:
+        """Look up a dividend value in the cache only, see `lookup_dividend`.
+        
+        Returns:
+            Cached dividend value, or None on a cache miss
+        """
+        entry = await self.cache.get_dividend(netuid, hotkey)
+        return self._cached_lookup((netuid, hotkey), entry) if entry is not None else None
+
+    async def lookup_uncached(self, netuid: int, hotkey: str) -> DividendLookup:
+        """Fetch a dividend value missing from the cache from the chain, see `lookup_dividend`."""
+        CACHE_LOOKUPS.labels("miss").inc()
+        fetch = self.single_flight.do(
+            cache_key(netuid, hotkey),
+            lambda: self._fetch_dividend(netuid, hotkey),
+        )
+        try:
+            dividend = await asyncio.wait_for(fetch, remaining(chain_deadline.get()))
+        except asyncio.TimeoutError:
+            logger.error(f"Deadline exceeded waiting for dividend of {cache_key(netuid, hotkey)}.")
+            dividend = None
+        return DividendLookup(dividend, False)
+
+    async def get_dividends(self, keys: list[tuple[int, str]]) -> dict[tuple[int, str], DividendLookup]:
+        """Retrieve dividend values for several (netuid, hotkey) pairs with caching.
+        
+        Cache hits are resolved with one cache read, all misses are fetched from the chain
+        in one multi-key query and written back to the cache in one pipeline.
+        
+        Args:
+            keys: List of (netuid, hotkey) pairs
+            
+        Returns:
+            Dividend lookups keyed by (netuid, hotkey)
+        """
+        keys = list(dict.fromkeys(keys))
+        results = await self.get_cached_dividends(keys)
+        results.update(await self.get_uncached_dividends([key for key in keys if key not in results]))
+        return results
+
+    async def get_cached_dividends(self, keys: list[tuple[int, str]]) -> dict[tuple[int, str], DividendLookup]:
+        """Retrieve dividend values from the cache only, see `get_dividends`.
+        
+        Returns:
+            Dividend lookups keyed by (netuid, hotkey), missing keys are omitted
+        """
+        cached = await self.cache.get_dividends(keys)
+        return {key: self._cached_lookup(key, entry) for key, entry in cached.items()}
+
+    async def get_uncached_dividends(self, keys: list[tuple[int, str]]) -> dict[tuple[int, str], DividendLookup]:
+        """Fetch dividend values missing from the cache from the chain, see `get_dividends`."""
+        CACHE_LOOKUPS.labels("miss").inc(len(keys))
+        if not keys:
+            return {}
+
+        fetched = await self.chain.get_dividends(keys) or {}
+        if fetched:
+            await self.cache.store_dividends(fetched)
+        return {key: DividendLookup(fetched.get(key), False) for key in keys}
+
+    def _cached_lookup(self, key: tuple[int, str], entry: CachedDividend) -> DividendLookup:
+        stale = not entry.is_fresh(self.redis_ttl)
+        CACHE_LOOKUPS.labels("stale" if stale else "hit").inc()
+        if stale:
+            self._revalidate(key)
+
+        return DividendLookup(entry.dividend, True, stale, entry.block, entry.age())
+
+    def _revalidate(self, key: tuple[int, str]):
+        if key in self._revalidating:
+            return
+
+        self._revalidating.add(key)
+        task = asyncio.create_task(self.single_flight.do(cache_key(*key), lambda: self._fetch_dividend(*key)))
+        self._background.add(task)
+        task.add_done_callback(lambda done: self._revalidated(key, done))
+
+    def _revalidated(self, key: tuple[int, str], task: asyncio.Task):
+        self._revalidating.discard(key)
+        self._background.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"Background refresh of {cache_key(*key)} failed: {task.exception()}")
+
+    async def prefetch_subnet(self, netuid: int, lock_timeout: int = 60) -> int | None:
+        """Load dividend values of every hotkey of given netuid into the cache.
+        
+        Only one process prefetches a given netuid at a time, others skip it.
+        
+        Args:
+            netuid: Network subnet ID
+            lock_timeout: Seconds after which the prefetch lock expires if never released
+            
+        Returns:
+            Number of cached values, or None if skipped or the chain query failed
+        """
+        lock = await self.cache.acquire_lock(prefetch_lock_key(netuid), lock_timeout)
+        if lock is None:
+            logger.info(f"Prefetch of netuid {netuid} already running elsewhere, skipping.")
+            return None
+
+        try:
+            dividends = await self.chain.get_subnet_dividends(netuid)
+            if dividends is None:
+                return None
+
+            await self.cache.store_dividends({(netuid, hotkey): dividend for hotkey, dividend in dividends.items()})
+            return len(dividends)
+        finally:
+            await self.cache.release_lock(lock)
+
+    async def prefetch_subnets(self, netuids: list[int]) -> dict[int, int | None]:
+        """Prefetch several subnets concurrently, see `prefetch_subnet`.
+        
+        Returns:
+            Number of cached values (or None) keyed by netuid
+        """
+        counts = await asyncio.gather(*[self.prefetch_subnet(netuid) for netuid in netuids])
+        return dict(zip(netuids, counts))
+
+    async def snapshot_subnets(self, netuids: list[int]) -> tuple[int | None, dict[int, dict[str, int] | None]]:
+        """Read dividend values of every hotkey of several subnets at the current block.
+
+        All subnets are read at the same block, so their values form a consistent snapshot.
+
+        Returns:
+            Number of the block, and dividend values keyed by netuid and hotkey (None if the
+            query of a netuid failed), or None and no values if the block could not be read
+        """
+        block = await self.chain.get_block_number()
+        if block is None:
+            return None, {}
+
+        dividends = await asyncio.gather(*[self.chain.get_subnet_dividends(netuid, block) for netuid in netuids])
+        return block, dict(zip(netuids, dividends))
 
-        dividend = await self.chain.get_dividend(netuid, hotkey)
-        if dividend is not None:
-            await self.cache.store_dividend(netuid, hotkey, dividend)
+    async def _fetch_dividend(self, netuid: int, hotkey: str) -> int | None:
+        lock = None
+        if self.fetch_lock_timeout:
+            lock = await self.cache.acquire_lock(fetch_lock_key(netuid, hotkey), self.fetch_lock_timeout)
+            if lock is None:
+                # Another process is already querying the chain for this key, wait for its result.
+                timeout = self.fetch_lock_timeout
+                if chain_deadline.get() is not None:
+                    timeout = min(timeout, remaining(chain_deadline.get()))
+                dividend = await self.cache.wait_for_dividend(netuid, hotkey, timeout)
+                if dividend is not None:
+                    DIVIDEND_FETCHES.labels("coalesced_by_lock").inc()
+                    return dividend
 
-        return dividend, False
+        try:
+            dividend = await self.chain.get_dividend(netuid, hotkey)
+            if dividend is not None:
+                await self.cache.store_dividend(netuid, hotkey, dividend)
+
+            return dividend
+        finally:
+            if lock is not None:
+                await self.cache.release_lock(lock)
 
 
 class ChainHandler:
     """Handles interactions with the Bittensor blockchain.
     
     Manages concurrent connections and retries for blockchain queries.
+
+    Failed queries are retried with jittered exponential backoff, never past the current
+    `chain_deadline`. All queries share one circuit breaker: while the chain error rate is
+    too high queries fail fast, returning None like any failed query, until a probe succeeds.
+
+    Given several endpoints, each query goes to the healthy endpoint with the lowest latency
+    EWMA, and retries go to endpoints that have not failed it yet. With `hedge` set, a
+    single-key query still running after the endpoint's p95 latency is duplicated on the next
+    best endpoint and the first result wins. Batch, subnet and block number queries take
+    longer by nature, so they are neither hedged nor part of the latency EWMA and p95.
     """
 
-    def __init__(self, chain_url: str, chain_max_concurrent: int, max_retries: int):
-        self.chain_url = chain_url
-        self.semaphore = asyncio.Semaphore(chain_max_concurrent)
+    BATCH_SIZE = 100
+    PREFETCH_PAGE_SIZE = 500
+
+    def __init__(self, chain_url: str | list[str], chain_max_concurrent: int, max_retries: int,
+                 health_check_interval: int = 30, backoff_base: float = 0.5, backoff_max: float = 5,
+                 breaker: CircuitBreaker | None = None, hedge: bool = False):
+        chain_urls = [chain_url] if isinstance(chain_url, str) else chain_url
+        self.endpoints = [ChainEndpoint(url, chain_max_concurrent, health_check_interval) for url in chain_urls]
         self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.breaker = breaker or CircuitBreaker()
+        self.hedge = hedge
+        self.hedged = 0
+        self._hedge_losers: set[asyncio.Task] = set()
+
+    async def connect(self):
+        await asyncio.gather(*[endpoint.pool.open() for endpoint in self.endpoints])
+
+    def queue_depth(self) -> int:
+        """Number of queries waiting for a pooled connection."""
+        return sum(endpoint.pool.waiting for endpoint in self.endpoints)
+
+    def queue_delay(self) -> float:
+        """Seconds the longest waiting query has been waiting for a pooled connection."""
+        return max(endpoint.pool.queue_delay() for endpoint in self.endpoints)
+
+    async def close(self):
+        await asyncio.gather(*[endpoint.pool.close() for endpoint in self.endpoints])
 
     async def get_dividend(self, netuid: int, hotkey: str) -> int | None:
         """Query blockchain for dividend value of given netuid and hotkey.
@@ -61,50 +379,500 @@ class ChainHandler:
         Returns:
             Dividend value or None if query fails
         """
+
+        async def query(substrate: AsyncSubstrateInterface) -> int:
+            result = await substrate.query(
+                "SubtensorModule",
+                "TaoDividendsPerSubnet",
+                [netuid, hotkey],
+            )
+
+            return int(result.value)
+
+        return await self._query_with_retries(query, point=True)
+
+    async def get_dividends(self, keys: list[tuple[int, str]], block: int | None = None) -> dict[tuple[int, str], int] | None:
+        """Query blockchain for dividend values of several (netuid, hotkey) pairs.
+        
+        Keys are read with one `state_queryStorageAt` request per `BATCH_SIZE` keys over
+        a single pooled connection.
+        
+        Args:
+            keys: List of (netuid, hotkey) pairs
+            block: Number of the block to read at, the chain head if not given
+            
+        Returns:
+            Dividend values keyed by (netuid, hotkey), or None if query fails
+        """
+
+        async def query(substrate: AsyncSubstrateInterface) -> dict[tuple[int, str], int]:
+            block_hash = await substrate.get_block_hash(block) if block is not None else None
+            dividends = {}
+            for start in range(0, len(keys), self.BATCH_SIZE):
+                batch = keys[start:start + self.BATCH_SIZE]
+                storage_keys = [
+                    await substrate.create_storage_key("SubtensorModule", "TaoDividendsPerSubnet", [netuid, hotkey])
+                    for netuid, hotkey in batch
+                ]
+                by_storage_key = {storage_key.to_hex(): key for storage_key, key in zip(storage_keys, batch)}
+                # Keys without a stored value are absent or None, matching the storage default of 0.
+                dividends.update({key: 0 for key in batch})
+                for storage_key, value in await substrate.query_multi(storage_keys, block_hash=block_hash):
+                    dividends[by_storage_key[storage_key.to_hex()]] = int(value or 0)
+
+            return dividends
+
+        if not keys:
+            return {}
+
+        return await self._query_with_retries(query)
+
+    async def get_subnet_dividends(self, netuid: int, block: int | None = None) -> dict[str, int] | None:
+        """Query blockchain for dividend values of every hotkey of given netuid.
+        
+        Iterates the `TaoDividendsPerSubnet` storage map with `PREFETCH_PAGE_SIZE` entries
+        per page instead of querying hotkeys one by one.
+        
+        Args:
+            netuid: Network subnet ID
+            block: Number of the block to read at, the chain head if not given
+            
+        Returns:
+            Dividend values keyed by hotkey, or None if query fails
+        """
+
+        async def query(substrate: AsyncSubstrateInterface) -> dict[str, int]:
+            block_hash = await substrate.get_block_hash(block) if block is not None else None
+            result = await substrate.query_map(
+                "SubtensorModule",
+                "TaoDividendsPerSubnet",
+                [netuid],
+                block_hash=block_hash,
+                page_size=self.PREFETCH_PAGE_SIZE,
+            )
+
+            return {decode_account_id(hotkey): int(dividend.value) async for hotkey, dividend in result}
+
+        return await self._query_with_retries(query)
+
+    async def get_block_number(self) -> int | None:
+        """Query blockchain for the number of the head block, or None if query fails."""
+
+        async def query(substrate: AsyncSubstrateInterface) -> int:
+            return await substrate.get_block_number(None)
+
+        return await self._query_with_retries(query)
+
+    async def _query_with_retries(self, query: Callable[[AsyncSubstrateInterface], Awaitable[T]],
+                                  point: bool = False) -> T | None:
+        """Run `query` with retries, hedged and sampled for endpoint latency only if it is a `point` query."""
+        failed: set[ChainEndpoint] = set()
+
+        async def attempt_query() -> T:
+            endpoints = self._rank_endpoints(failed)
+            try:
+                if not point:
+                    return await endpoints[0].run(query, sample=False)
+                return await self._query_hedged(endpoints, query)
+            except Exception:
+                failed.add(endpoints[0])
+                raise
+
+        deadline = chain_deadline.get()
+        attempts = 0
+        reason = "exhausted"
         for attempt in range(self.max_retries):
+            if not self.breaker.allow():
+                logger.warning("Chain circuit breaker open, failing fast.")
+                CHAIN_FAILURES.labels("circuit_open").inc()
+                return None
+
+            attempts += 1
             try:
-                async with self.semaphore:
-                    async with AsyncSubstrateInterface(self.chain_url, ss58_format=SS58_FORMAT, max_retries=5,
-                                                       retry_timeout=5) as substrate:
-                        result = await substrate.query(
-                            "SubtensorModule",
-                            "TaoDividendsPerSubnet",
-                            [netuid, hotkey],
-                        )
-
-                        return int(result.value)
+                # Waiting for a pooled connection counts against the deadline too.
+                result = await asyncio.wait_for(attempt_query(), remaining(deadline))
+                self.breaker.record_success()
+                return result
             except ValueError as e:
+                # The chain did answer, the request itself is invalid.
+                self.breaker.record_success()
                 logger.error(f"Invalid response: {e}. Aborting retries.")
+                reason = "invalid"
                 break
 
             except Exception as e:
-                logger.error(f"Substrate query error: {e}")
-                if attempt < self.max_retries - 1:
-                    await asyncio.sleep(5)
+                self.breaker.record_failure()
+                logger.error(f"Substrate query error: {e!r}")
+                if attempt == self.max_retries - 1:
+                    break
+
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                if deadline is not None and time.monotonic() + delay >= deadline:
+                    logger.error("Deadline exceeded, aborting retries.")
+                    reason = "deadline"
+                    break
+                CHAIN_RETRIES.inc()
+                await asyncio.sleep(delay)
 
-        logger.error(f"Failed to fetch dividend after {self.max_retries} attempts.")
+        logger.error(f"Failed to fetch dividend after {attempts} attempts.")
+        CHAIN_FAILURES.labels(reason).inc()
         return None
 
+    def _rank_endpoints(self, failed: set["ChainEndpoint"]) -> list["ChainEndpoint"]:
+        """Order endpoints by preference for the next attempt of a query that already failed on `failed`."""
+        return sorted(self.endpoints, key=lambda endpoint: (endpoint in failed, not endpoint.healthy(),
+                                                            endpoint.latency or 0))
+
+    async def _query_hedged(self, endpoints: list["ChainEndpoint"],
+                            query: Callable[[AsyncSubstrateInterface], Awaitable[T]]) -> T:
+        primary = asyncio.ensure_future(endpoints[0].run(query))
+        delay = endpoints[0].hedge_delay() if self.hedge and len(endpoints) > 1 else None
+        if delay is None:
+            return await primary
+
+        pending = {primary}
+        try:
+            done, _ = await asyncio.wait(pending, timeout=delay)
+            if not done:
+                self.hedged += 1
+                CHAIN_HEDGED.inc()
+                pending.add(asyncio.ensure_future(endpoints[1].run(query)))
+
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                answered = [task for task in done
+                            if task.exception() is None or isinstance(task.exception(), ValueError)]
+                if answered:
+                    return answered[0].result()
+                if not pending:
+                    return done.pop().result()
+        except asyncio.CancelledError:
+            for task in pending:
+                task.cancel()
+            raise
+        finally:
+            # Let the slower query finish in the background, cancelling it would drop its connection.
+            for task in pending:
+                self._hedge_losers.add(task)
+                task.add_done_callback(self._hedge_done)
+
+    def _hedge_done(self, task: asyncio.Task):
+        self._hedge_losers.discard(task)
+        if not task.cancelled():
+            task.exception()
+
+
+class ChainEndpoint:
+    """A chain node with its connection pool and exponentially weighted latency and error rate.
+
+    An endpoint whose error rate reaches `ERROR_THRESHOLD` is unhealthy until
+    `RETRY_INTERVAL` seconds have passed since its last failure, then it is tried again.
+    """
+
+    ALPHA = 0.3
+    ERROR_THRESHOLD = 0.5
+    RETRY_INTERVAL = 30
+    HEDGE_MIN_SAMPLES = 20
+
+    def __init__(self, url: str, pool_size: int, health_check_interval: int = 30):
+        self.url = url
+        self.pool = SubstratePool(url, pool_size, health_check_interval)
+        self.latency: float | None = None
+        self.error_rate = 0.0
+        self.last_failure = 0.0
+        self._latencies: deque[float] = deque(maxlen=200)
+
+    def healthy(self) -> bool:
+        return self.error_rate < self.ERROR_THRESHOLD or time.monotonic() - self.last_failure > self.RETRY_INTERVAL
+
+    def hedge_delay(self) -> float | None:
+        """p95 of recent query latencies, None until enough queries were made."""
+        if len(self._latencies) < self.HEDGE_MIN_SAMPLES:
+            return None
+        return sorted(self._latencies)[int(0.95 * (len(self._latencies) - 1))]
+
+    async def run(self, query: Callable[[AsyncSubstrateInterface], Awaitable[T]], sample: bool = True) -> T:
+        """Run a query on a pooled connection, recording its latency or failure.
+
+        Args:
+            query: Query to run on a substrate connection
+            sample: Whether the query latency is a sample of the endpoint latency EWMA and p95
+        """
+        start = time.monotonic()
+        try:
+            async with self.pool.connection() as substrate:
+                result = await query(substrate)
+        except ValueError:
+            self._record(time.monotonic() - start if sample else None, False)
+            CHAIN_QUERY_LATENCY.labels(self.url, "invalid").observe(time.monotonic() - start)
+            raise
+        except Exception:
+            self._record(None, True)
+            CHAIN_QUERY_LATENCY.labels(self.url, "error").observe(time.monotonic() - start)
+            raise
+
+        self._record(time.monotonic() - start if sample else None, False)
+        CHAIN_QUERY_LATENCY.labels(self.url, "ok").observe(time.monotonic() - start)
+        return result
+
+    def _record(self, latency: float | None, failed: bool):
+        self.error_rate += self.ALPHA * (failed - self.error_rate)
+        if failed:
+            self.last_failure = time.monotonic()
+        if latency is None:
+            return
+
+        self._latencies.append(latency)
+        self.latency = latency if self.latency is None else self.latency + self.ALPHA * (latency - self.latency)
+
+
+class SubstratePool:
+    """Fixed-size pool of long-lived substrate connections.
+
+    Each pooled connection keeps its websocket open between queries and caches the chain
+    runtime and metadata, so a query only pays for the storage request itself. Connections
+    idle for longer than `health_check_interval` seconds are checked before reuse, and a
+    connection that fails a query is dropped and transparently re-established on next use.
+    The pool size also bounds the number of concurrent chain queries.
+    """
+
+    def __init__(self, chain_url: str, size: int, health_check_interval: int = 30):
+        self.chain_url = chain_url
+        self.size = size
+        self.health_check_interval = health_check_interval
+        self._idle: asyncio.Queue[_PooledSubstrate] = asyncio.Queue()
+        self._waiting: dict[object, float] = {}
+        for _ in range(size):
+            self._idle.put_nowait(_PooledSubstrate())
+
+    async def open(self):
+        """Eagerly establish all pooled connections.
+
+        Failures are only logged, affected connections are retried lazily on first use.
+        """
+        slots = [self._idle.get_nowait() for _ in range(self._idle.qsize())]
+        results = await asyncio.gather(*[self._connect(slot) for slot in slots], return_exceptions=True)
+        for slot, result in zip(slots, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to open substrate connection: {result}")
+            self._idle.put_nowait(slot)
+
+    async def close(self):
+        """Close all idle connections."""
+        slots = [self._idle.get_nowait() for _ in range(self._idle.qsize())]
+        await asyncio.gather(*[slot.reset() for slot in slots])
+        for slot in slots:
+            self._idle.put_nowait(slot)
+
+    @property
+    def waiting(self) -> int:
+        """Number of queries waiting for a connection."""
+        return len(self._waiting)
+
+    def queue_delay(self) -> float:
+        """Seconds the longest waiting query has been waiting for a connection."""
+        if not self._waiting:
+            return 0.0
+        return time.monotonic() - next(iter(self._waiting.values()))
+
+    @asynccontextmanager
+    async def connection(self) -> AsyncIterator[AsyncSubstrateInterface]:
+        """Borrow a connection from the pool, waiting for one to become free if needed."""
+        waiter = object()
+        self._waiting[waiter] = time.monotonic()
+        try:
+            with CHAIN_POOL_WAIT.labels(self.chain_url).time(), \
+                    CHAIN_POOL_WAITING.labels(self.chain_url).track_inprogress():
+                slot = await self._idle.get()
+        finally:
+            del self._waiting[waiter]
+        try:
+            substrate = await self._checkout(slot)
+            try:
+                yield substrate
+            except ValueError:
+                raise
+            except (Exception, asyncio.CancelledError):
+                # The socket state is unknown after a failed or cancelled query, reconnect on next use.
+                await slot.reset()
+                raise
+        finally:
+            slot.last_used = time.monotonic()
+            self._idle.put_nowait(slot)
+
+    async def _checkout(self, slot: "_PooledSubstrate") -> AsyncSubstrateInterface:
+        if slot.substrate is None:
+            await self._connect(slot)
+        elif time.monotonic() - slot.last_used > self.health_check_interval:
+            try:
+                await slot.substrate.get_chain_head()
+            except Exception as e:
+                logger.warning(f"Substrate connection health check failed: {e}. Reconnecting.")
+                await slot.reset()
+                await self._connect(slot)
+
+        return slot.substrate
+
+    async def _connect(self, slot: "_PooledSubstrate"):
+        substrate = AsyncSubstrateInterface(self.chain_url, ss58_format=SS58_FORMAT, max_retries=5, retry_timeout=5)
+        # Keep the websocket open while the connection sits idle in the pool.
+        substrate.ws.shutdown_timer = self.health_check_interval * 2
+        await substrate.initialize()
+        slot.substrate = substrate
+        slot.last_used = time.monotonic()
+
+
+class _PooledSubstrate:
+    def __init__(self):
+        self.substrate: AsyncSubstrateInterface | None = None
+        self.last_used = 0.0
+
+    async def reset(self):
+        substrate, self.substrate = self.substrate, None
+        if substrate is not None:
+            try:
+                await substrate.close()
+            except Exception as e:
+                logger.warning(f"Error closing substrate connection: {e}")
+
 
 class CacheHandler:
     """Handles Redis caching operations for Bittensor data.
     
     Provides methods to store and retrieve dividend values from Redis cache.
+    All operations share one bounded connection pool, created on `connect` or lazily
+    on first use, and released on `close`.
+
+    Values expire from Redis after `redis_ttl` seconds.
+
+    With the default `layout` of `KEYS` every value is a top-level Redis string keyed by
+    `cache_key`. With `HASH` the values of a subnet are fields of one Redis hash keyed by
+    `subnet_cache_key`, read with one `HMGET` per subnet and written with one `HSET` per
+    subnet; the hash expires `redis_ttl` seconds after its last write, and fields stored
+    longer ago than that are ignored on read and deleted by a write to the hash, at most
+    once per `redis_ttl` seconds per subnet and process as it scans the whole hash.
+
+    With `local_cache_size` set, values are also kept in an in-process LRU cache in front
+    of Redis. Every store publishes the stored keys on `INVALIDATION_CHANNEL`, whether or not
+    the writer has an in-process cache itself, and the listener started by `connect` evicts
+    keys stored by other processes, so no process serves a value older than the one in Redis
+    for longer than the pub/sub delivery time.
+
+    With `track_hot_keys` set, every lookup is recorded locally and `flush_hot_keys` merges
+    the accessed keys into the `HOT_KEYS` sorted set scored by last access time.
+
+    Keys streamed to clients are kept in the `WATCHED_KEYS` sorted set scored by expiry
+    time, and their values are published on `UPDATES_CHANNEL` whenever they are refreshed.
     """
 
-    def __init__(self, redis_url: str, redis_ttl: int):
+    INVALIDATION_CHANNEL = "dividends:invalidate"
+    UPDATES_CHANNEL = "dividends:updates"
+    HOT_KEYS = "dividends:hot"
+    WATCHED_KEYS = "dividends:watched"
+    KEYS = "keys"
+    HASH = "hash"
+
+    def __init__(self, redis_url: str, redis_ttl: int, max_connections: int = 50, pool_timeout: int = 5,
+                 local_cache_size: int = 0, local_cache_ttl: float = 5, local_cache_max_bytes: int = 0,
+                 track_hot_keys: bool = False, layout: str = KEYS):
+        if layout not in (self.KEYS, self.HASH):
+            raise ValueError(f"Unknown cache layout: {layout}")
+
         self.redis_url = redis_url
         self.redis_ttl = redis_ttl
+        self.max_connections = max_connections
+        self.pool_timeout = pool_timeout
+        self._redis: aioredis.Redis | None = None
+        self.local = LocalCache(local_cache_size, min(local_cache_ttl, redis_ttl),
+                                local_cache_max_bytes) if local_cache_size else None
+        self.instance_id = uuid.uuid4().hex
+        self._invalidation_listener: asyncio.Task | None = None
+        self.track_hot_keys = track_hot_keys
+        self.layout = layout
+        self._accessed: dict[str, float] = {}
+        self._prune_script: Script | None = None
+        self._pruned_at: dict[int, float] = {}
 
-    async def get_dividend(self, netuid: int, hotkey: str) -> int | None:
-        redis = await aioredis.from_url(self.redis_url, decode_responses=True)
+    @property
+    def redis(self) -> aioredis.Redis:
+        """Shared Redis client backed by the handler's connection pool."""
+        if self._redis is None:
+            pool = aioredis.BlockingConnectionPool.from_url(
+                self.redis_url,
+                max_connections=self.max_connections,
+                timeout=self.pool_timeout,
+                decode_responses=True,
+            )
+            self._redis = aioredis.Redis(connection_pool=pool)
+        return self._redis
+
+    async def connect(self):
+        await self.redis.ping()
+        if self.local is not None and self._invalidation_listener is None:
+            self._invalidation_listener = asyncio.create_task(self._listen_invalidations())
+
+    async def close(self):
+        listener, self._invalidation_listener = self._invalidation_listener, None
+        if listener is not None:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+        redis, self._redis = self._redis, None
+        if redis is not None:
+            await redis.close()
+            await redis.connection_pool.disconnect()
+
+    async def get_dividend(self, netuid: int, hotkey: str) -> CachedDividend | None:
+        key = cache_key(netuid, hotkey)
+        self._touch(key)
+        if self.local is not None:
+            entry = self.local.get(key)
+            if entry is not None:
+                return entry
 
-        cached_value = await redis.get(cache_key(netuid, hotkey))
-        if cached_value is not None:
-            return int(cached_value)
+        if self.layout == self.HASH:
+            cached_value = await self.redis.hget(subnet_cache_key(netuid), hotkey)
+        else:
+            cached_value = await self.redis.get(key)
+        entry = self._decode(cached_value)
+        if entry is not None:
+            if self.local is not None:
+                self.local.set(key, entry)
+            return entry
 
         return None
 
+    async def get_dividends(self, keys: list[tuple[int, str]]) -> dict[tuple[int, str], CachedDividend]:
+        """Retrieve several dividend values with a single Redis `MGET` for local cache misses.
+        
+        Args:
+            keys: List of (netuid, hotkey) pairs
+            
+        Returns:
+            Cached dividend values keyed by (netuid, hotkey), missing keys are omitted
+        """
+        entries = {}
+        missing = []
+        for netuid, hotkey in keys:
+            self._touch(cache_key(netuid, hotkey))
+            entry = self.local.get(cache_key(netuid, hotkey)) if self.local is not None else None
+            if entry is not None:
+                entries[(netuid, hotkey)] = entry
+            else:
+                missing.append((netuid, hotkey))
+
+        if not missing:
+            return entries
+
+        for (netuid, hotkey), cached_value in zip(missing, await self._read_values(missing)):
+            entry = self._decode(cached_value)
+            if entry is not None:
+                entries[(netuid, hotkey)] = entry
+                if self.local is not None:
+                    self.local.set(cache_key(netuid, hotkey), entries[(netuid, hotkey)])
+
+        return entries
+
     async def store_dividend(self, netuid: int, hotkey: str, dividend: int):
         """Store dividend value in Redis cache.
         
@@ -113,12 +881,227 @@ class CacheHandler:
             hotkey: Wallet hotkey address
             dividend: Dividend value to cache
         """
-        redis = await aioredis.from_url(self.redis_url, decode_responses=True)
-        await redis.set(
-            cache_key(netuid, hotkey),
-            dividend,
-            ex=self.redis_ttl,
-        )
+        await self.store_dividends({(netuid, hotkey): dividend})
+
+    async def acquire_lock(self, name: str, timeout: int) -> Lock | None:
+        """Try to take a lock shared by all processes without blocking.
+        
+        Args:
+            name: Redis key of the lock
+            timeout: Seconds after which the lock expires if never released
+            
+        Returns:
+            Acquired lock, or None if another process holds it
+        """
+        lock = self.redis.lock(name, timeout=timeout)
+        if await lock.acquire(blocking=False):
+            return lock
+
+        return None
+
+    async def release_lock(self, lock: Lock):
+        try:
+            await lock.release()
+        except LockError as e:
+            logger.warning(f"Failed to release lock: {e}")
+
+    async def wait_for_dividend(self, netuid: int, hotkey: str, timeout: float, poll_interval: float = 0.05) -> int | None:
+        """Wait for a concurrent fetch holding the key's lock to store the dividend.
+        
+        Args:
+            netuid: Network subnet ID
+            hotkey: Wallet hotkey address
+            timeout: Maximum seconds to wait
+            poll_interval: Seconds between cache polls
+            
+        Returns:
+            Dividend value, or None if the lock was released or expired without storing one
+        """
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            await asyncio.sleep(poll_interval)
+            async with self.redis.pipeline(transaction=False) as pipe:
+                if self.layout == self.HASH:
+                    pipe.hget(subnet_cache_key(netuid), hotkey)
+                else:
+                    pipe.get(cache_key(netuid, hotkey))
+                cached_value, locked = await pipe.exists(fetch_lock_key(netuid, hotkey)).execute()
+
+            entry = self._decode(cached_value)
+            if entry is not None:
+                return entry.dividend
+            if not locked:
+                break
+
+        return None
+
+    async def store_dividends(self, dividends: dict[tuple[int, str], int], block: int | None = None):
+        """Store several dividend values in one pipelined round-trip.
+        
+        Args:
+            dividends: Dividend values keyed by (netuid, hotkey)
+            block: Number of the block the values were read at, if known
+        """
+        if not dividends:
+            return
+
+        stored_at = time.time()
+        subnets: dict[int, dict[str, str]] = {}
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for (netuid, hotkey), dividend in dividends.items():
+                key = cache_key(netuid, hotkey)
+                entry = CachedDividend(dividend, block, stored_at)
+                if self.layout == self.HASH:
+                    subnets.setdefault(netuid, {})[hotkey] = encode_cached_value(entry)
+                else:
+                    pipe.set(key, encode_cached_value(entry), ex=self.redis_ttl)
+                if self.local is not None:
+                    self.local.set(key, entry)
+            for netuid, values in subnets.items():
+                pipe.hset(subnet_cache_key(netuid), mapping=values)
+                pipe.expire(subnet_cache_key(netuid), self.redis_ttl)
+                if stored_at - self._pruned_at.get(netuid, 0) >= self.redis_ttl:
+                    self._pruned_at[netuid] = stored_at
+                    await self._prune(pipe, subnet_cache_key(netuid), stored_at - self.redis_ttl)
+            # Published by writers without an in-process cache too, like the worker, for the API processes.
+            keys = " ".join(cache_key(netuid, hotkey) for netuid, hotkey in dividends)
+            pipe.publish(self.INVALIDATION_CHANNEL, f"{self.instance_id} {keys}")
+            await pipe.execute()
+
+    async def flush_hot_keys(self, window: int):
+        """Merge keys looked up since the last flush into the hot key set.
+        
+        Args:
+            window: Seconds after their last access keys are dropped from the set
+        """
+        accessed, self._accessed = self._accessed, {}
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if accessed:
+                pipe.zadd(self.HOT_KEYS, accessed)
+            pipe.zremrangebyscore(self.HOT_KEYS, "-inf", now - window)
+            await pipe.execute()
+
+    async def get_hot_keys(self, limit: int) -> list[tuple[int, str]]:
+        """Return up to `limit` most recently accessed (netuid, hotkey) pairs."""
+        keys = await self.redis.zrevrange(self.HOT_KEYS, 0, limit - 1)
+        return [parse_cache_key(key) for key in keys]
+
+    async def watch_keys(self, keys: list[tuple[int, str]], ttl: int):
+        """Mark keys as watched by streaming clients for the next `ttl` seconds.
+        
+        Args:
+            keys: List of (netuid, hotkey) pairs
+            ttl: Seconds after which keys are no longer watched unless marked again
+        """
+        now = time.time()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            if keys:
+                pipe.zadd(self.WATCHED_KEYS, {cache_key(netuid, hotkey): now + ttl for netuid, hotkey in keys})
+            pipe.zremrangebyscore(self.WATCHED_KEYS, "-inf", now)
+            await pipe.execute()
+
+    async def get_watched_keys(self, limit: int) -> list[tuple[int, str]]:
+        """Return up to `limit` (netuid, hotkey) pairs currently watched by streaming clients."""
+        keys = await self.redis.zrevrangebyscore(self.WATCHED_KEYS, "+inf", time.time(), start=0, num=limit)
+        return [parse_cache_key(key) for key in keys]
+
+    async def publish_updates(self, dividends: dict[tuple[int, str], int], block: int | None = None):
+        """Publish dividend values read at a block to streaming clients in a single message."""
+        message = {
+            "block": block,
+            "dividends": {cache_key(netuid, hotkey): dividend for (netuid, hotkey), dividend in dividends.items()},
+        }
+        await self.redis.publish(self.UPDATES_CHANNEL, json.dumps(message))
+
+    async def _read_values(self, keys: list[tuple[int, str]]) -> list[str | None]:
+        if self.layout != self.HASH:
+            return await self.redis.mget([cache_key(netuid, hotkey) for netuid, hotkey in keys])
+
+        subnets: dict[int, list[str]] = {}
+        for netuid, hotkey in keys:
+            subnets.setdefault(netuid, []).append(hotkey)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            for netuid, hotkeys in subnets.items():
+                pipe.hmget(subnet_cache_key(netuid), hotkeys)
+            results = await pipe.execute()
+
+        values = {}
+        for (netuid, hotkeys), cached_values in zip(subnets.items(), results):
+            values.update(zip([(netuid, hotkey) for hotkey in hotkeys], cached_values))
+        return [values[key] for key in keys]
+
+    async def _prune(self, pipe: Pipeline, key: str, cutoff: float):
+        if self._prune_script is None or self._prune_script.registered_client is not self.redis:
+            self._prune_script = self.redis.register_script(PRUNE_HASH_SCRIPT)
+        await self._prune_script(keys=[key], args=[cutoff], client=pipe)
+
+    def _decode(self, cached_value: str | None) -> CachedDividend | None:
+        if cached_value is None:
+            return None
+
+        entry = decode_cached_value(cached_value)
+        # Hash fields do not expire on their own.
+        if self.layout == self.HASH and entry.age() is not None and entry.age() >= self.redis_ttl:
+            return None
+        return entry
+
+    def _touch(self, key: str):
+        if self.track_hot_keys:
+            self._accessed[key] = time.time()
+
+    async def _listen_invalidations(self):
+        while True:
+            pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.INVALIDATION_CHANNEL)
+                # Invalidations may have been missed while (re)subscribing.
+                self.local.clear()
+                async for message in pubsub.listen():
+                    origin, *keys = message["data"].split(" ")
+                    if origin != self.instance_id:
+                        for key in keys:
+                            self.local.invalidate(key)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Cache invalidation listener error: {e}. Resubscribing.")
+                self.local.clear()
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+
+def bittensor_from_config(**overrides) -> Bittensor:
+    """Build the `Bittensor` service from the environment, shared by the API and the worker.
+
+    Args:
+        overrides: `Bittensor` arguments replacing the configured ones, for what differs per process
+
+    Returns:
+        Bittensor service, not connected yet
+    """
+    settings = {
+        "chain_url": config('CHAIN_URL', cast=Csv()),
+        "redis_url": config('REDIS_HOST'),
+        "redis_ttl": config('REDIS_TTL', cast=int),
+        "chain_max_concurrent": config('CHAIN_MAX_CONCURRENT', cast=int),
+        "max_retries": config('MAX_RETRIES', cast=int),
+        "chain_health_check_interval": config('CHAIN_HEALTH_CHECK_INTERVAL', cast=int, default=30),
+        "redis_max_connections": config('REDIS_MAX_CONNECTIONS', cast=int, default=50),
+        "fetch_lock_timeout": config('CHAIN_FETCH_LOCK_TIMEOUT', cast=int, default=10),
+        "local_cache_size": config('LOCAL_CACHE_SIZE', cast=int, default=10000),
+        "local_cache_ttl": config('LOCAL_CACHE_TTL', cast=float, default=5),
+        "local_cache_max_bytes": config('LOCAL_CACHE_MAX_BYTES', cast=int, default=16 * 1024 * 1024),
+        "redis_stale_ttl": config('REDIS_STALE_TTL', cast=int, default=600),
+        "chain_backoff_base": config('CHAIN_BACKOFF_BASE', cast=float, default=0.5),
+        "chain_backoff_max": config('CHAIN_BACKOFF_MAX', cast=float, default=5),
+        "breaker_error_threshold": config('CHAIN_BREAKER_ERROR_THRESHOLD', cast=float, default=0.5),
+        "breaker_reset_timeout": config('CHAIN_BREAKER_RESET_TIMEOUT', cast=float, default=30),
+        "chain_hedge": config('CHAIN_HEDGE_ENABLED', cast=bool, default=True),
+        "cache_layout": config('CACHE_LAYOUT', default='keys'),
+    }
+    return Bittensor(**{**settings, **overrides})
 
 
 def cache_key(netuid: int, hotkey: str) -> str:
@@ -132,3 +1115,73 @@ def cache_key(netuid: int, hotkey: str) -> str:
         Formatted cache key string
     """
     return f"{netuid}:{hotkey}"
+
+
+def subnet_cache_key(netuid: int) -> str:
+    """Generate Redis key of the hash holding the dividend values of a subnet in the `HASH` layout."""
+    return f"dividends:{netuid}"
+
+
+def parse_cache_key(key: str) -> tuple[int, str]:
+    """Split a cache key generated by `cache_key` back into (netuid, hotkey)."""
+    netuid, hotkey = key.split(":", 1)
+    return int(netuid), hotkey
+
+
+def encode_cached_value(entry: CachedDividend) -> str:
+    """Serialize a cached dividend for storing in Redis.
+    
+    Args:
+        entry: Dividend value with the block it was read at and the time it was stored
+        
+    Returns:
+        `dividend:block:stored_at` string, unknown fields left empty
+    """
+    block = entry.block if entry.block is not None else ""
+    stored_at = f"{entry.stored_at:.3f}" if entry.stored_at is not None else ""
+    return f"{entry.dividend}:{block}:{stored_at}"
+
+
+def decode_cached_value(value: str) -> CachedDividend:
+    """Parse a value serialized by `encode_cached_value`.
+    
+    Plain `dividend` and `dividend:block` values written by earlier versions are accepted too.
+    
+    Args:
+        value: Cached string
+        
+    Returns:
+        Cached dividend
+    """
+    dividend, block, stored_at = (value.split(":") + ["", ""])[:3]
+    return CachedDividend(int(dividend), int(block) if block else None, float(stored_at) if stored_at else None)
+
+
+def remaining(deadline: float | None) -> float | None:
+    """Seconds left until a `time.monotonic()` deadline, None if there is no deadline."""
+    return max(deadline - time.monotonic(), 0) if deadline is not None else None
+
+
+def fetch_lock_key(netuid: int, hotkey: str) -> str:
+    """Generate Redis key of the lock guarding a chain fetch of a dividend value.
+    
+    Args:
+        netuid: Network subnet ID
+        hotkey: Wallet hotkey address
+        
+    Returns:
+        Formatted lock key string
+    """
+    return f"lock:{cache_key(netuid, hotkey)}"
+
+
+def prefetch_lock_key(netuid: int) -> str:
+    """Generate Redis key of the lock guarding a prefetch of a whole subnet.
+    
+    Args:
+        netuid: Network subnet ID
+        
+    Returns:
+        Formatted lock key string
+    """
+    return f"lock:prefetch:{netuid}"
@@ -0,0 +1,141 @@
+import asyncio
+import logging
+
+from aioredis.exceptions import LockError
+from aioredis.lock import Lock
+from async_substrate_interface.async_substrate import AsyncSubstrateInterface
+
+from services.bittensor import SS58_FORMAT, Bittensor
+
+logger = logging.getLogger(__name__)
+
+
+class BlockRefresher:
+    """Refreshes recently requested dividend values whenever a new block is produced.
+
+    Every process flushes the keys it served into the shared hot key set. One process at a
+    time, elected through a Redis lock, subscribes to new block heads and re-reads the
+    `max_keys_per_block` most recently accessed keys at the new block, so hot keys are
+    rewritten (tagged with the block number) before they expire and requests for them
+    are served from the cache.
+
+    With `max_watched_keys` set, up to that many keys watched by streaming clients are
+    re-read at every block too and their values published to all processes, so a single
+    block subscription serves every streaming client.
+    """
+
+    LOCK_KEY = "lock:block-refresher"
+
+    def __init__(self, bittensor: Bittensor, chain_url: str | list[str], max_keys_per_block: int,
+                 hot_key_window: int, flush_interval: float = 1, lock_timeout: int = 60,
+                 max_watched_keys: int = 0):
+        self.bittensor = bittensor
+        self.chain_urls = [chain_url] if isinstance(chain_url, str) else chain_url
+        self.max_keys_per_block = max_keys_per_block
+        self.hot_key_window = hot_key_window
+        self.flush_interval = flush_interval
+        self.lock_timeout = lock_timeout
+        self.max_watched_keys = max_watched_keys
+        self.last_block: int | None = None
+        self.refreshed_block: int | None = None
+        self._new_block = asyncio.Event()
+
+    async def run(self):
+        """Run until cancelled, refreshing keys while holding the refresher lock."""
+        await asyncio.gather(self._flush_hot_keys(), self._lead())
+
+    async def _flush_hot_keys(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            try:
+                await self.bittensor.cache.flush_hot_keys(self.hot_key_window)
+            except Exception as e:
+                logger.error(f"Failed to flush hot keys: {e}")
+
+    async def _lead(self):
+        cache = self.bittensor.cache
+        while True:
+            try:
+                lock = await cache.acquire_lock(self.LOCK_KEY, self.lock_timeout)
+            except Exception as e:
+                logger.error(f"Failed to acquire block refresher lock: {e}")
+                lock = None
+
+            if lock is None:
+                await asyncio.sleep(self.lock_timeout / 2)
+                continue
+
+            logger.info("Block refresher elected, subscribing to new blocks.")
+            subscription = asyncio.create_task(self._subscribe())
+            try:
+                await self._refresh_on_new_blocks(lock)
+            except Exception as e:
+                logger.error(f"Block refresher error: {e}")
+            finally:
+                subscription.cancel()
+                await asyncio.gather(subscription, return_exceptions=True)
+                await cache.release_lock(lock)
+
+    async def _refresh_on_new_blocks(self, lock: Lock):
+        while True:
+            try:
+                await asyncio.wait_for(self._new_block.wait(), timeout=self.lock_timeout / 3)
+            except asyncio.TimeoutError:
+                pass
+
+            # Keep the lock alive even if no block arrived, and step down if it was lost.
+            try:
+                await lock.reacquire()
+            except LockError:
+                logger.warning("Block refresher lock lost, stepping down.")
+                return
+
+            if not self._new_block.is_set():
+                continue
+
+            self._new_block.clear()
+            block = self.last_block
+            if block != self.refreshed_block:
+                await self._refresh(block)
+                self.refreshed_block = block
+
+    async def _refresh(self, block: int):
+        keys = await self.bittensor.cache.get_hot_keys(self.max_keys_per_block)
+        watched = []
+        if self.max_watched_keys:
+            watched = await self.bittensor.cache.get_watched_keys(self.max_watched_keys)
+            keys = list(dict.fromkeys(keys + watched))
+        if not keys:
+            return
+
+        dividends = await self.bittensor.chain.get_dividends(keys, block)
+        if dividends is None:
+            logger.error(f"Failed to refresh {len(keys)} hot keys at block {block}.")
+            return
+
+        await self.bittensor.cache.store_dividends(dividends, block)
+        if watched:
+            await self.bittensor.cache.publish_updates({key: dividends[key] for key in watched}, block)
+        logger.debug(f"Refreshed {len(dividends)} hot keys at block {block}.")
+
+    async def _subscribe(self):
+        async def on_block(block: dict):
+            self.last_block = block["header"]["number"]
+            self._new_block.set()
+
+        attempt = 0
+        while True:
+            # Dedicated connection, a subscription would hold a pooled one indefinitely.
+            chain_url = self.chain_urls[attempt % len(self.chain_urls)]
+            substrate = AsyncSubstrateInterface(chain_url, ss58_format=SS58_FORMAT, retry_timeout=60)
+            try:
+                await substrate.initialize()
+                await substrate.subscribe_block_headers(on_block)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Block subscription error on {chain_url}: {e}. Resubscribing.")
+                attempt += 1  # Move on to the next endpoint
+                await asyncio.sleep(1)
+            finally:
+                await substrate.close()
@@ -0,0 +1,82 @@
+import asyncio
+import logging
+import time
+
+import aioredis
+from decouple import config
+
+from services.bittensor import decode_cached_value, encode_cached_value, parse_cache_key, subnet_cache_key
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate_keys_to_hashes(redis: aioredis.Redis, ttl: int, batch_size: int = 500) -> int:
+    """Move cached dividend values from the `KEYS` layout into the per-subnet hashes of the `HASH` layout.
+
+    Values already in a hash were written after switching layouts and are kept. Migrated keys
+    are deleted, so the migration can be interrupted and run again at any time.
+
+    Args:
+        redis: Redis client
+        ttl: Seconds cached values are kept for, the `CacheHandler.redis_ttl`
+        batch_size: Keys migrated per round-trip
+
+    Returns:
+        Number of migrated values
+    """
+    migrated = 0
+    batch = []
+    async for key in redis.scan_iter(match="[0-9]*:*", count=batch_size):
+        netuid, _, _ = key.partition(":")
+        if netuid.isdigit():
+            batch.append(key)
+        if len(batch) >= batch_size:
+            migrated += await _migrate_batch(redis, batch, ttl)
+            batch = []
+
+    if batch:
+        migrated += await _migrate_batch(redis, batch, ttl)
+    return migrated
+
+
+async def _migrate_batch(redis: aioredis.Redis, keys: list[str], ttl: int) -> int:
+    async with redis.pipeline(transaction=False) as pipe:
+        for key in keys:
+            pipe.get(key)
+            pipe.pttl(key)
+        results = await pipe.execute()
+
+    now = time.time()
+    migrated = 0
+    async with redis.pipeline(transaction=False) as pipe:
+        for key, value, pttl in zip(keys, results[::2], results[1::2]):
+            if value is None:
+                continue
+
+            entry = decode_cached_value(value)
+            if entry.stored_at is None and pttl > 0:
+                # Values of earlier versions have no storage time, derive it from the remaining TTL.
+                entry = entry._replace(stored_at=now - ttl + pttl / 1000)
+            netuid, hotkey = parse_cache_key(key)
+            pipe.hsetnx(subnet_cache_key(netuid), hotkey, encode_cached_value(entry))
+            pipe.expire(subnet_cache_key(netuid), ttl)
+            migrated += 1
+        pipe.delete(*keys)
+        await pipe.execute()
+
+    return migrated
+
+
+async def main():
+    redis = aioredis.from_url(config('REDIS_HOST'), decode_responses=True)
+    try:
+        ttl = max(config('REDIS_TTL', cast=int), config('REDIS_STALE_TTL', cast=int, default=600))
+        migrated = await migrate_keys_to_hashes(redis, ttl)
+        logger.info(f"Migrated {migrated} cached dividend values to the hash layout.")
+    finally:
+        await redis.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(main())
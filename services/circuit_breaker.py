@@ -0,0 +1,64 @@
+import time
+from collections import deque
+
+
+class CircuitBreaker:
+    """Fails calls fast while the error rate of recent calls is too high.
+
+    Records the outcome of the last `window` calls. Once at least `min_calls` are recorded
+    and the share of failures reaches `error_threshold`, the circuit opens and `allow`
+    rejects calls for `reset_timeout` seconds. After that the circuit is half-open and lets
+    a single probe call through per `reset_timeout`: a success closes the circuit, a failure
+    opens it again.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, error_threshold: float = 0.5, reset_timeout: float = 30, window: int = 20,
+                 min_calls: int = 10):
+        self.error_threshold = error_threshold
+        self.reset_timeout = reset_timeout
+        self.min_calls = min_calls
+        self.state = self.CLOSED
+        self.rejected = 0
+        self._outcomes: deque[bool] = deque(maxlen=window)
+        self._retry_at = 0.0
+
+    def allow(self) -> bool:
+        """Whether a call may be made now, admitting a probe if the circuit is due for one."""
+        if self.state == self.CLOSED:
+            return True
+
+        now = time.monotonic()
+        if now < self._retry_at:
+            self.rejected += 1
+            return False
+
+        self.state = self.HALF_OPEN
+        self._retry_at = now + self.reset_timeout
+        return True
+
+    def record_success(self):
+        if self.state != self.CLOSED:
+            self.state = self.CLOSED
+            self._outcomes.clear()
+            return
+
+        self._outcomes.append(True)
+
+    def record_failure(self):
+        if self.state != self.CLOSED:
+            self._open()
+            return
+
+        self._outcomes.append(False)
+        failures = self._outcomes.count(False)
+        if len(self._outcomes) >= self.min_calls and failures / len(self._outcomes) >= self.error_threshold:
+            self._open()
+
+    def _open(self):
+        self.state = self.OPEN
+        self._retry_at = time.monotonic() + self.reset_timeout
+        self._outcomes.clear()
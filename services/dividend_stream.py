@@ -0,0 +1,153 @@
+import asyncio
+import json
+import logging
+
+from services.bittensor import Bittensor, parse_cache_key
+from services.metrics import STREAM_CLIENTS
+
+logger = logging.getLogger(__name__)
+
+
+class Subscription:
+    """Dividend updates for the keys one streaming client subscribed to.
+
+    Updates not consumed yet are coalesced per key, so a slow client receives the latest
+    value of each key instead of a growing backlog, and values already sent are skipped.
+    """
+
+    def __init__(self):
+        self.keys: set[tuple[int, str]] = set()
+        self._sent: dict[tuple[int, str], int] = {}
+        self._pending: dict[tuple[int, str], dict] = {}
+        self._ready = asyncio.Event()
+
+    def push(self, update: dict):
+        key = (update["netuid"], update["hotkey"])
+        if key not in self.keys or self._sent.get(key) == update["dividend"]:
+            return
+
+        self._sent[key] = update["dividend"]
+        self._pending[key] = update
+        self._ready.set()
+
+    async def next(self, timeout: float | None = None) -> list[dict]:
+        """Wait for updates and take them, or return an empty list after `timeout` seconds."""
+        if not self._ready.is_set():
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout)
+            except asyncio.TimeoutError:
+                return []
+
+        self._ready.clear()
+        updates, self._pending = list(self._pending.values()), {}
+        return updates
+
+    def discard(self, key: tuple[int, str]):
+        self.keys.discard(key)
+        self._sent.pop(key, None)
+        self._pending.pop(key, None)
+
+
+class DividendStream:
+    """Pushes dividend updates to streaming clients of this process.
+
+    Keys subscribed to by local clients are marked as watched in Redis every `watch_ttl / 3`
+    seconds. The elected block refresher re-reads all watched keys at every block and
+    publishes their values in one message on `CacheHandler.UPDATES_CHANNEL`, which this
+    process receives over a single Redis subscription and fans out to the subscribed
+    clients, so any number of clients in any number of processes is served by one chain
+    subscription.
+    """
+
+    def __init__(self, bittensor: Bittensor, max_keys: int = 100, watch_ttl: int = 30):
+        self.bittensor = bittensor
+        self.max_keys = max_keys
+        self.watch_ttl = watch_ttl
+        self._subscribers: dict[tuple[int, str], set[Subscription]] = {}
+
+    async def run(self):
+        """Run until cancelled, receiving published updates and keeping local keys watched."""
+        await asyncio.gather(self._listen(), self._watch())
+
+    def subscribe(self) -> Subscription:
+        STREAM_CLIENTS.inc()
+        return Subscription()
+
+    async def add(self, subscription: Subscription, keys: list[tuple[int, str]]):
+        """Subscribe to more keys, pushing their current values.
+
+        Args:
+            subscription: Subscription of the client
+            keys: List of (netuid, hotkey) pairs
+
+        Raises:
+            ValueError: If the subscription would exceed `max_keys` keys
+        """
+        keys = [key for key in dict.fromkeys(keys) if key not in subscription.keys]
+        if len(subscription.keys) + len(keys) > self.max_keys:
+            raise ValueError(f"At most {self.max_keys} keys can be subscribed to")
+        if not keys:
+            return
+
+        subscription.keys.update(keys)
+        for key in keys:
+            self._subscribers.setdefault(key, set()).add(subscription)
+
+        # Watched right away, so the next block already refreshes new keys.
+        await self.bittensor.cache.watch_keys(keys, self.watch_ttl)
+        lookups = await self.bittensor.get_dividends(keys)
+        for (netuid, hotkey), lookup in lookups.items():
+            if lookup.dividend is not None:
+                subscription.push({"netuid": netuid, "hotkey": hotkey, "dividend": lookup.dividend,
+                                   "block": lookup.block})
+
+    def remove(self, subscription: Subscription, keys: list[tuple[int, str]]):
+        """Unsubscribe from keys."""
+        for key in keys:
+            subscription.discard(key)
+            subscribers = self._subscribers.get(key)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[key]
+
+    def close(self, subscription: Subscription):
+        """Unsubscribe from all keys of a disconnected client."""
+        self.remove(subscription, list(subscription.keys))
+        STREAM_CLIENTS.dec()
+
+    def dispatch(self, message: str):
+        """Fan out a message published by `CacheHandler.publish_updates` to the subscribed clients."""
+        data = json.loads(message)
+        for key, dividend in data["dividends"].items():
+            netuid, hotkey = parse_cache_key(key)
+            subscribers = self._subscribers.get((netuid, hotkey))
+            if not subscribers:
+                continue
+
+            update = {"netuid": netuid, "hotkey": hotkey, "dividend": dividend, "block": data["block"]}
+            for subscription in subscribers:
+                subscription.push(update)
+
+    async def _listen(self):
+        while True:
+            pubsub = self.bittensor.cache.redis.pubsub(ignore_subscribe_messages=True)
+            try:
+                await pubsub.subscribe(self.bittensor.cache.UPDATES_CHANNEL)
+                async for message in pubsub.listen():
+                    self.dispatch(message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error(f"Dividend update listener error: {e}. Resubscribing.")
+                await asyncio.sleep(1)
+            finally:
+                await pubsub.close()
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.watch_ttl / 3)
+            try:
+                await self.bittensor.cache.watch_keys(list(self._subscribers), self.watch_ttl)
+            except Exception as e:
+                logger.error(f"Failed to watch streamed keys: {e}")
@@ -0,0 +1,58 @@
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LocalCache:
+    """In-process LRU cache with per-entry TTL.
+
+    Bounded by number of entries and, optionally, by an approximate memory footprint of
+    keys and values. The least recently used entries are evicted first.
+    """
+
+    def __init__(self, max_entries: int, ttl: float, max_bytes: int = 0):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.size_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[Hashable, tuple[Any, float, int]] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: Hashable) -> Any | None:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._entries.get(key)
+        if entry is None or entry[1] <= time.monotonic():
+            if entry is not None:
+                self.invalidate(key)
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0]
+
+    def set(self, key: Hashable, value: Any, ttl: float | None = None):
+        """Cache a value for `ttl` seconds (the cache default if not given)."""
+        self.invalidate(key)
+
+        size = sys.getsizeof(key) + sys.getsizeof(value)
+        self._entries[key] = (value, time.monotonic() + (self.ttl if ttl is None else ttl), size)
+        self.size_bytes += size
+
+        while len(self._entries) > self.max_entries or (self.max_bytes and self.size_bytes > self.max_bytes):
+            _, (_, _, evicted_size) = self._entries.popitem(last=False)
+            self.size_bytes -= evicted_size
+
+    def invalidate(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self.size_bytes -= entry[2]
+
+    def clear(self):
+        self._entries.clear()
+        self.size_bytes = 0
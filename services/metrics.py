@@ -0,0 +1,62 @@
+import os
+
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, CollectorRegistry, Counter, Gauge, Histogram, \
+    generate_latest, multiprocess
+
+# Metrics of processes started side by side (uvicorn or prefork Celery workers) are only
+# aggregated if PROMETHEUS_MULTIPROC_DIR points to a directory shared by them.
+
+REQUEST_LATENCY = Histogram(
+    "api_request_duration_seconds", "API request latency.", ["route", "method", "status"])
+CACHE_LOOKUPS = Counter(
+    "dividend_cache_lookups_total", "Dividend lookups by cache result (hit, stale or miss).", ["result"])
+DIVIDEND_FETCHES = Counter(
+    "dividend_fetches_total",
+    "Dividend fetches for cache misses, by outcome (executed, coalesced_in_process or coalesced_by_lock).",
+    ["outcome"])
+REQUESTS_REJECTED = Counter(
+    "api_requests_rejected_total", "Requests rejected with 429, by reason (shed or rate_limited).", ["reason"])
+
+CHAIN_QUERY_LATENCY = Histogram(
+    "chain_query_duration_seconds", "Chain query latency per endpoint and outcome.", ["endpoint", "outcome"])
+CHAIN_RETRIES = Counter(
+    "chain_query_retries_total", "Chain queries retried after a failed attempt.")
+CHAIN_FAILURES = Counter(
+    "chain_query_failures_total", "Chain queries given up, by reason.", ["reason"])
+CHAIN_HEDGED = Counter(
+    "chain_queries_hedged_total", "Chain queries duplicated on a second endpoint.")
+CHAIN_POOL_WAIT = Histogram(
+    "chain_pool_wait_seconds", "Time spent waiting for a pooled chain connection.", ["endpoint"])
+CHAIN_POOL_WAITING = Gauge(
+    "chain_pool_waiting", "Queries waiting for a pooled chain connection.", ["endpoint"],
+    multiprocess_mode="livesum")
+
+LLM_SEMAPHORE_WAIT = Histogram(
+    "llm_semaphore_wait_seconds", "Time spent waiting for an LLM request slot.")
+LLM_WAITING = Gauge(
+    "llm_requests_waiting", "LLM requests waiting for a request slot.", multiprocess_mode="livesum")
+
+STREAM_CLIENTS = Gauge(
+    "dividend_stream_clients", "Clients connected to the dividend stream.", multiprocess_mode="livesum")
+
+AUTH_DB_LATENCY = Histogram(
+    "auth_db_query_duration_seconds", "Latency of token validation database queries.")
+
+TASK_STAGE_DURATION = Histogram(
+    "task_stage_duration_seconds", "Background task duration per stage.", ["stage"],
+    buckets=(0.1, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, float("inf")))
+
+
+def registry() -> CollectorRegistry:
+    """Registry to expose, aggregating all processes in multiprocess mode."""
+    if not os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        return REGISTRY
+
+    collector_registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(collector_registry)
+    return collector_registry
+
+
+def render() -> (bytes, str):
+    """Current metrics in the Prometheus text format, with their content type."""
+    return generate_latest(registry()), CONTENT_TYPE_LATEST
@@ -0,0 +1,83 @@
+import hashlib
+import logging
+
+import aioredis
+from aioredis.client import Script
+
+logger = logging.getLogger(__name__)
+
+# Refills the bucket for the time elapsed since its last update, then takes ARGV[3] tokens
+# if available. Returns 1 and 0 if allowed, else 0 and the milliseconds until it would be.
+# Runs atomically on the server, using the server clock so all processes agree.
+TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local time = redis.call('TIME')
+local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+local bucket = redis.call('HMGET', KEYS[1], 'tokens', 'updated')
+local tokens = tonumber(bucket[1]) or burst
+local updated = tonumber(bucket[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - updated) * rate)
+
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = math.ceil((cost - tokens) / rate * 1000)
+end
+
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'updated', tostring(now))
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return {allowed, retry_after}
+"""
+
+
+class RateLimiter:
+    """Token bucket rate limiter per client, shared by all processes through Redis.
+
+    Each client may make `burst` requests at once, refilled at `rate` requests per second.
+    Buckets are updated atomically by a server-side script and expire once full again.
+    Redis errors are logged and let requests through.
+    """
+
+    REDIS_PREFIX = "ratelimit:"
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.redis: aioredis.Redis | None = None
+        self._script: Script | None = None
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    async def acquire(self, client: str, cost: int = 1) -> float:
+        """Take `cost` tokens from the client's bucket.
+
+        Args:
+            client: Identity of the client, e.g. its bearer token
+            cost: Number of requests to account for
+
+        Returns:
+            0 if allowed, else seconds until the bucket holds enough tokens
+        """
+        if not self.enabled:
+            return 0
+
+        try:
+            if self._script is None or self._script.registered_client is not self.redis:
+                self._script = self.redis.register_script(TOKEN_BUCKET_SCRIPT)
+            allowed, retry_after = await self._script(keys=[self._redis_key(client)],
+                                                      args=[self.rate, self.burst, min(cost, self.burst)])
+        except Exception as e:
+            logger.error(f"Rate limiter unavailable, allowing request: {e}")
+            return 0
+
+        return 0 if allowed else int(retry_after) / 1000
+
+    def _redis_key(self, client: str) -> str:
+        return self.REDIS_PREFIX + hashlib.sha256(client.encode()).hexdigest()
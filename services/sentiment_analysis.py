@@ -1,14 +1,28 @@
 import asyncio
+import hashlib
+import json
 import logging
 import re
 from datetime import datetime, timedelta
 from typing import List
 
 import aiohttp
+import aioredis
 from datura_py import Datura
 
+from services.local_cache import LocalCache
+from services.metrics import LLM_SEMAPHORE_WAIT, LLM_WAITING, TASK_STAGE_DURATION
+from services.single_flight import SingleFlight
+
 logger = logging.getLogger(__name__)
 
+CHUTES_URL = "https://llm.chutes.ai/v1/chat/completions"
+LLM_MODEL = "unsloth/Llama-3.2-3B-Instruct"
+# Bump whenever the scoring prompts change, so scores memoized for the old prompts are not reused.
+PROMPT_VERSION = 2
+MAX_TOKENS_PER_TWEET = 32
+SCORE_PATTERN = re.compile(r'(score)\s*:?(is)?\s*([+-]?\d+)', re.IGNORECASE)
+
 
 class SentimentAnalyser:
     def __init__(self,
@@ -16,18 +30,47 @@ class SentimentAnalyser:
                  tweet_days_range: int,
                  tweet_limit: int,
                  chutest_api_key: str,
-                 chutest_max_concurrent: int):
+                 chutest_max_concurrent: int,
+                 redis: aioredis.Redis | None = None,
+                 tweet_cache_ttl: int = 3600,
+                 score_cache: LocalCache | None = None,
+                 score_cache_ttl: int = 604800,
+                 score_batch_size: int = 1,
+                 stream: bool = False):
         self.datura_api_key = datura_api_key
         self.tweet_days_range = tweet_days_range
         self.tweet_limit = tweet_limit
         self.chutest_api_key = chutest_api_key
         self.semaphore = asyncio.Semaphore(chutest_max_concurrent)
+        self.redis = redis
+        self.tweet_cache_ttl = tweet_cache_ttl
+        self.score_cache = score_cache
+        self.score_cache_ttl = score_cache_ttl
+        self.score_batch_size = max(score_batch_size, 1)
+        self.stream = stream
+        self.single_flight = SingleFlight()
+        self._session: aiohttp.ClientSession | None = None
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        """HTTP session shared by all LLM requests, created on first use."""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(headers={
+                "Authorization": "Bearer " + self.chutest_api_key,
+                "Content-Type": "application/json"
+            })
+        return self._session
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
 
     async def get_sentiment(self, netuid: int) -> float | None:
-        tweets = self._get_tweets(netuid)
-        scores = await asyncio.gather(
-            *[self._score_tweet(tweet, netuid) for tweet in tweets]
-        )
+        with TASK_STAGE_DURATION.labels("search").time():
+            tweets = await self._get_tweets(netuid)
+        with TASK_STAGE_DURATION.labels("scoring").time():
+            scores = await self._score_tweets(tweets, netuid)
 
         scores = [x for x in scores if x is not None]
 
@@ -36,14 +79,25 @@ class SentimentAnalyser:
 
         return sum(scores) / len(scores)
 
-    def _get_tweets(self, netuid: int) -> List[str]:
-        datura = Datura(api_key=self.datura_api_key)
-
+    async def _get_tweets(self, netuid: int) -> List[str]:
+        """Fetch top tweets about given netuid, cached per netuid and date range in Redis."""
         start_date = (datetime.now() - timedelta(days=self.tweet_days_range)).strftime("%Y-%m-%d")
         current_date = datetime.now().strftime("%Y-%m-%d")
+        key = tweets_cache_key(netuid, start_date, current_date)
+
+        tweets = await self._get_cached_tweets(key)
+        if tweets is not None:
+            return tweets
+
+        return await self.single_flight.do(key, lambda: self._search_tweets(key, netuid, start_date, current_date))
+
+    async def _search_tweets(self, key: str, netuid: int, start_date: str, current_date: str) -> List[str]:
+        datura = Datura(api_key=self.datura_api_key)
 
         try:
-            result = datura.basic_twitter_search(
+            # The Datura client is synchronous, keep it off the event loop.
+            result = await asyncio.to_thread(
+                datura.basic_twitter_search,
                 query=f"Bittensor netuid {netuid}",
                 sort="Top",
                 start_date=start_date,
@@ -60,20 +114,164 @@ class SentimentAnalyser:
             logger.error(f"Error fetching tweets: {e}")
             return []
 
-        return [tweet['text'] for tweet in result]
+        tweets = [tweet['text'] for tweet in result]
+        await self._store_cached_tweets(key, tweets)
+        return tweets
 
-    async def _score_tweet(self, tweet: str, netuid: int) -> int | None:
-        headers = {
-            "Authorization": "Bearer " + self.chutest_api_key,
-            "Content-Type": "application/json"
-        }
+    async def _get_cached_tweets(self, key: str) -> List[str] | None:
+        if self.redis is None:
+            return None
+
+        try:
+            cached = await self.redis.get(key)
+        except Exception as e:
+            logger.error(f"Error reading cached tweets: {e}")
+            return None
+
+        return json.loads(cached) if cached is not None else None
+
+    async def _store_cached_tweets(self, key: str, tweets: List[str]):
+        if self.redis is None:
+            return
+
+        try:
+            await self.redis.set(key, json.dumps(tweets), ex=self.tweet_cache_ttl)
+        except Exception as e:
+            logger.error(f"Error caching tweets: {e}")
+
+    async def _score_tweets(self, tweets: List[str], netuid: int) -> List[int | None]:
+        """Score tweets, reusing memoized scores and sending the rest to the LLM in batches.
+
+        Args:
+            tweets: Tweet texts
+            netuid: Subnet the tweets are scored for
+
+        Returns:
+            Score per tweet, None if the tweet is unrelated or could not be scored
+        """
+        keys = [score_cache_key(netuid, tweet) for tweet in tweets]
+        scores = await self._get_cached_scores(list(dict.fromkeys(keys)))
+
+        missing = list({key: tweet for key, tweet in zip(keys, tweets) if key not in scores}.items())
+        batches = [dict(missing[i:i + self.score_batch_size]) for i in range(0, len(missing), self.score_batch_size)]
+        for batch_scores in await asyncio.gather(*[self._score_batch(batch, netuid) for batch in batches]):
+            scores.update(batch_scores)
 
+        return [scores.get(key) for key in keys]
+
+    async def _score_batch(self, batch: dict[str, str], netuid: int) -> dict[str, int | None]:
+        """Score tweets (keyed by their score cache key) with a single LLM request.
+
+        Returns:
+            Score per key, empty if the request failed or its response could not be parsed
+        """
+        tweets = list(batch.values())
         body = {
-            "model": "unsloth/Llama-3.2-3B-Instruct",
+            "model": LLM_MODEL,
             "messages": [
                 {
                     "role": "assistant",
-                    "content": f'''
+                    "content": score_prompt(tweets[0], netuid) if len(tweets) == 1 else batch_score_prompt(tweets, netuid)
+                }
+            ],
+            "stream": self.stream,
+            "max_tokens": MAX_TOKENS_PER_TWEET * len(tweets),
+            "temperature": 0.5
+        }
+
+        try:
+            content = await self._complete(body, len(tweets))
+        except Exception as e:
+            logger.error(f"Error fetching and parsing LLM response: {e}")
+            return {}
+
+        scores = parse_scores(content, len(tweets))
+        if scores is None:
+            # Not memoized, so the tweets are scored again next time.
+            logger.error(f"Unexpected LLM response for {len(tweets)} tweets: {content}")
+            return {}
+
+        result = dict(zip(batch, scores))
+        await self._store_cached_scores(result)
+        return result
+
+    async def _complete(self, body: dict, count: int) -> str:
+        """Send a chat completion request and return the generated content.
+
+        In streaming mode the response is read only until all `count` scores can be parsed,
+        then the connection is closed so the generation is cancelled.
+        """
+        with LLM_SEMAPHORE_WAIT.time(), LLM_WAITING.track_inprogress():
+            await self.semaphore.acquire()
+
+        try:
+            async with self.session.post(CHUTES_URL, json=body) as response:
+                if not body["stream"]:
+                    resp = await response.json()
+                    return resp['choices'][0]['message']['content']
+
+                content = ""
+                async for line in response.content:
+                    line = line.decode().strip()
+                    if not line.startswith("data:"):
+                        continue
+                    data = line[len("data:"):].strip()
+                    if data == "[DONE]":
+                        break
+
+                    content += json.loads(data)['choices'][0]['delta'].get('content') or ""
+                    if parse_scores(content, count, partial=True) is not None:
+                        response.close()
+                        break
+
+                return content
+        finally:
+            self.semaphore.release()
+
+    async def _get_cached_scores(self, keys: List[str]) -> dict[str, int | None]:
+        scores = {}
+        if self.score_cache is not None:
+            for key in keys:
+                cached = self.score_cache.get(key)
+                if cached is not None:
+                    scores[key] = decode_score(cached)
+
+        missing = [key for key in keys if key not in scores]
+        if self.redis is None or not missing:
+            return scores
+
+        try:
+            values = await self.redis.mget(missing)
+        except Exception as e:
+            logger.error(f"Error reading cached scores: {e}")
+            return scores
+
+        for key, cached in zip(missing, values):
+            if cached is not None:
+                scores[key] = decode_score(cached)
+                if self.score_cache is not None:
+                    self.score_cache.set(key, cached)
+        return scores
+
+    async def _store_cached_scores(self, scores: dict[str, int | None]):
+        if self.score_cache is not None:
+            for key, score in scores.items():
+                self.score_cache.set(key, encode_score(score))
+
+        if self.redis is None:
+            return
+
+        try:
+            async with self.redis.pipeline(transaction=False) as pipe:
+                for key, score in scores.items():
+                    pipe.set(key, encode_score(score), ex=self.score_cache_ttl)
+                await pipe.execute()
+        except Exception as e:
+            logger.error(f"Error caching scores: {e}")
+
+
+def score_prompt(tweet: str, netuid: int) -> str:
+    return f'''
                                 Does this tweet relates to 'Bittensor netuid {netuid}'?
                                 If yes, please estimate sentiment of this tweet from -100 to +100, 
                                 and then give me your score without reasons 
@@ -82,30 +280,72 @@ class SentimentAnalyser:
     
                                 {tweet}
                             '''
-                }
-            ],
-            "stream": False,
-            "max_tokens": 10000,
-            "temperature": 0.5
-        }
 
+
+def batch_score_prompt(tweets: List[str], netuid: int) -> str:
+    numbered = "\n\n".join(f"{i}. {tweet}" for i, tweet in enumerate(tweets, start=1))
+    return f'''
+                                For each of the {len(tweets)} numbered tweets below, decide whether it relates to 'Bittensor netuid {netuid}'.
+                                If yes, estimate sentiment of the tweet from -100 to +100, otherwise use null.
+                                Answer only with a JSON array of {len(tweets)} scores in the order of the tweets,
+                                for example [40, null, -15], without reasons.
+
+                                {numbered}
+                            '''
+
+
+def parse_scores(content: str, count: int, partial: bool = False) -> List[int | None] | None:
+    """Parse `count` per-tweet scores from an LLM response.
+
+    Expects a JSON array of scores, falls back to one 'score: value' match per tweet, or
+    the first match for a single tweet.
+
+    Args:
+        content: Response content
+        count: Number of scored tweets
+        partial: Whether more content may follow, so a number at its very end may be incomplete
+
+    Returns:
+        Scores in tweet order, or None if the response does not contain all of them (yet)
+    """
+    match = re.search(r'\[[^\[\]]*\]', content)
+    if match:
         try:
-            async with self.semaphore:
-                async with aiohttp.ClientSession() as session:
-                    async with session.post(
-                            "https://llm.chutes.ai/v1/chat/completions",
-                            headers=headers,
-                            json=body
-                    ) as response:
-                        resp = await response.json()
-                        content = resp['choices'][0]['message']['content']
-
-                        score_match = re.search(r'(score)\s*:?(is)?\s*([+-]?\d+)', content, re.IGNORECASE)
-                        if score_match:
-                            return int(score_match.group(3))
-                        return None
+            values = json.loads(match.group(0))
+        except ValueError:
+            values = None
+        if (isinstance(values, list) and len(values) == count
+                and all(value is None or isinstance(value, (int, float)) for value in values)):
+            return [None if value is None else int(value) for value in values]
 
-        except Exception as e:
-            logger.error(f"Error fetching and parsing LLM response: {e}")
+    matches = list(SCORE_PATTERN.finditer(content))
+    if count == 1:
+        # The model may repeat the score, the first one is used.
+        matches = matches[:1]
+    if len(matches) != count or partial and matches[-1].end() == len(content):
+        return None
+    return [int(match.group(3)) for match in matches]
 
-            return None
+
+def tweets_cache_key(netuid: int, start_date: str, end_date: str) -> str:
+    """Generate Redis cache key for tweets about a netuid within a date range."""
+    return f"tweets:{netuid}:{start_date}:{end_date}"
+
+
+def score_cache_key(netuid: int, tweet: str) -> str:
+    """Generate Redis cache key for the LLM score of a tweet.
+
+    The key is a hash of everything that determines the score: model, prompt version,
+    netuid and the tweet text.
+    """
+    digest = hashlib.sha256(f"{LLM_MODEL}\0{PROMPT_VERSION}\0{netuid}\0{tweet}".encode()).hexdigest()
+    return f"score:{digest}"
+
+
+def encode_score(score: int | None) -> str:
+    """Encode a score for caching, an empty string means the model gave no score."""
+    return "" if score is None else str(score)
+
+
+def decode_score(value: str) -> int | None:
+    return int(value) if value else None
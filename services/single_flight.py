@@ -0,0 +1,57 @@
+import asyncio
+from typing import Awaitable, Callable, Hashable, TypeVar
+
+from prometheus_client import Counter
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces concurrent calls for the same key into a single execution.
+
+    The first caller for a key starts the call, callers arriving while it is still running
+    wait for and share its result. The call runs as its own task, so a cancelled caller
+    does not cancel it for the others.
+
+    Executed and coalesced calls are counted, and also on the `executed_counter` and
+    `coalesced_counter` Prometheus counters if given.
+    """
+
+    def __init__(self, executed_counter: Counter | None = None, coalesced_counter: Counter | None = None):
+        self._calls: dict[Hashable, asyncio.Future] = {}
+        self.executed = 0
+        self.coalesced = 0
+        self.executed_counter = executed_counter
+        self.coalesced_counter = coalesced_counter
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]]) -> T:
+        """Run `fn` for given key unless a call for that key is already in flight.
+
+        Args:
+            key: Identity of the call
+            fn: Coroutine factory executed at most once per in-flight key
+
+        Returns:
+            Result of the (possibly shared) call
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(fn())
+            self._calls[key] = call
+            call.add_done_callback(lambda done: self._forget(key, done))
+            self.executed += 1
+            if self.executed_counter is not None:
+                self.executed_counter.inc()
+        else:
+            self.coalesced += 1
+            if self.coalesced_counter is not None:
+                self.coalesced_counter.inc()
+
+        return await asyncio.shield(call)
+
+    def _forget(self, key: Hashable, call: asyncio.Future):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+        if not call.cancelled():
+            # Mark the exception as retrieved even if every caller went away.
+            call.exception()
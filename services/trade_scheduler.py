@@ -0,0 +1,74 @@
+import logging
+from typing import Any, Callable
+
+import aioredis
+
+logger = logging.getLogger(__name__)
+
+
+class TradeScheduler:
+    """Coalesces trade requests so each subnet is analysed once for all requested hotkeys.
+
+    A request for `(netuid, hotkey)` is accepted at most once per `window` seconds, later
+    requests within the window join the already scheduled trade. Accepted hotkeys are added
+    to a pending set per netuid and a single task is enqueued per netuid until that task
+    takes the pending hotkeys with `take_pending`, so the sentiment is computed once and
+    fanned out to every hotkey requested for the subnet in the meantime.
+
+    The pending set and task marker are kept for `pending_ttl` seconds, long enough to outlive
+    a backed up queue and a slow analysis, and the task is enqueued with the hotkey that
+    scheduled it, so that hotkey is traded even if the pending set expired.
+    """
+
+    def __init__(self, window: int, pending_ttl: int = 3600):
+        self.window = window
+        self.pending_ttl = pending_ttl
+        self.redis: aioredis.Redis | None = None
+
+    async def schedule(self, netuid: int, hotkey: str, enqueue: Callable[[int, str], Any]) -> bool:
+        """Schedule a trade for given netuid and hotkey unless one is already scheduled.
+
+        Args:
+            netuid: Network subnet ID
+            hotkey: Wallet hotkey address
+            enqueue: Starts the trade task for a netuid and the hotkey scheduling it
+
+        Returns:
+            True if the trade was newly scheduled, False if it joined a scheduled one
+        """
+        if not await self.redis.set(trade_key(netuid, hotkey), 1, ex=self.window, nx=True):
+            return False
+
+        async with self.redis.pipeline(transaction=False) as pipe:
+            # The hotkey is added before checking the task marker, so a running task that
+            # already cleared the marker either takes it or a new task is enqueued.
+            pipe.sadd(pending_key(netuid), hotkey)
+            pipe.expire(pending_key(netuid), self.pending_ttl)
+            pipe.set(queued_key(netuid), 1, ex=self.pending_ttl, nx=True)
+            _, _, queued = await pipe.execute()
+
+        if queued:
+            enqueue(netuid, hotkey)
+        return True
+
+    async def take_pending(self, netuid: int) -> list[str]:
+        """Take all hotkeys pending for given netuid, later requests enqueue a new task."""
+        async with self.redis.pipeline(transaction=True) as pipe:
+            pipe.delete(queued_key(netuid))
+            pipe.smembers(pending_key(netuid))
+            pipe.delete(pending_key(netuid))
+            _, hotkeys, _ = await pipe.execute()
+
+        return sorted(hotkeys)
+
+
+def trade_key(netuid: int, hotkey: str) -> str:
+    return f"trade:{netuid}:{hotkey}"
+
+
+def pending_key(netuid: int) -> str:
+    return f"trade:pending:{netuid}"
+
+
+def queued_key(netuid: int) -> str:
+    return f"trade:queued:{netuid}"
@@ -0,0 +1,27 @@
+"""Enqueues worker tasks by name, for processes that do not run them.
+
+Importing `tasks.task` loads the worker runtime with the `bittensor` SDK, wallet and sentiment
+analysis, while sending a task only needs its name and the broker. Celery itself is imported
+on the first send, so it does not slow down startup either.
+"""
+import functools
+from typing import TYPE_CHECKING, Final
+
+from decouple import config
+
+if TYPE_CHECKING:
+    from celery import Celery
+
+BACKGROUND_TASK: Final = "tasks.task.background_task"
+
+
+@functools.cache
+def celery_app() -> "Celery":
+    from celery import Celery
+
+    return Celery("tasks", broker=f"{config('REDIS_HOST')}/0")
+
+
+def enqueue_background_task(netuid: int, hotkey: str | None = None):
+    """Enqueue `tasks.task.background_task`."""
+    celery_app().send_task(BACKGROUND_TASK, args=[netuid, hotkey])
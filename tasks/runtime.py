@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import threading
+from typing import Coroutine, TypeVar
+
+import aioredis
+from bittensor.core.async_subtensor import AsyncSubtensor
+from bittensor_wallet import Wallet
+from decouple import config
+
+from services.bittensor import Bittensor, bittensor_from_config
+from services.local_cache import LocalCache
+from services.sentiment_analysis import SentimentAnalyser
+from services.trade_scheduler import TradeScheduler
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class WorkerRuntime:
+    """State shared by all tasks of a Celery worker process.
+
+    Owns an event loop running in a background thread, so connections stay serviced between
+    tasks, together with the Redis client, sentiment analyser, dividend cache, trade
+    scheduler, subtensor connection and unlocked wallet. Tasks submit their coroutines with `run` instead of
+    setting all of this up with `asyncio.run` every time.
+    """
+
+    def __init__(self):
+        self.loop: asyncio.AbstractEventLoop | None = None
+        self.redis: aioredis.Redis | None = None
+        self.analyser: SentimentAnalyser | None = None
+        self.bittensor: Bittensor | None = None
+        self.wallet: Wallet | None = None
+        self.trades = TradeScheduler(config('TRADE_COALESCE_WINDOW', cast=int, default=60),
+                                     config('TRADE_PENDING_TTL', cast=int, default=3600))
+        self._subtensor: AsyncSubtensor | None = None
+        self._subtensor_lock: asyncio.Lock | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def started(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self.loop.run_forever, name="worker-runtime", daemon=True)
+        self._thread.start()
+        try:
+            self.run(self._open())
+        except Exception:
+            # Leave the runtime stopped, the next task retries the start.
+            self._shutdown_loop()
+            raise
+        logger.info("Worker runtime started.")
+
+    def stop(self):
+        if not self.started:
+            return
+
+        try:
+            self.run(self._close())
+        finally:
+            self._shutdown_loop()
+            logger.info("Worker runtime stopped.")
+
+    def _shutdown_loop(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
+        self._thread = None
+
+    def run(self, coro: Coroutine[None, None, T]) -> T:
+        """Run a coroutine on the runtime loop and wait for its result, starting the runtime if needed."""
+        if not self.started:
+            self.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def get_subtensor(self) -> AsyncSubtensor:
+        """Return the shared subtensor connection, connecting on first use or after `reset_subtensor`."""
+        async with self._subtensor_lock:
+            if self._subtensor is None:
+                subtensor = AsyncSubtensor(network=config('NETWORK'))
+                await subtensor.initialize()
+                self._subtensor = subtensor
+            return self._subtensor
+
+    async def reset_subtensor(self):
+        """Drop the subtensor connection, e.g. after an error, so the next task reconnects."""
+        async with self._subtensor_lock:
+            if self._subtensor is not None:
+                await self._subtensor.close()
+                self._subtensor = None
+
+    async def _open(self):
+        self._subtensor_lock = asyncio.Lock()
+        self.redis = aioredis.from_url(config('REDIS_HOST'), decode_responses=True)
+        self.trades.redis = self.redis
+
+        score_cache_ttl = config('SCORE_CACHE_TTL', cast=int, default=604800)
+        self.analyser = SentimentAnalyser(
+            datura_api_key=config('DATURA_API_KEY'),
+            tweet_days_range=config('TWEET_DAYS_RANGE', cast=int, default=10),
+            tweet_limit=config('TWEET_LIMIT', cast=int, default=10),
+            chutest_api_key=config('CHUTES_API_TOKEN'),
+            chutest_max_concurrent=config('CHUTES_MAX_CONCURRENT', cast=int, default=5),
+            redis=self.redis,
+            tweet_cache_ttl=config('TWEET_CACHE_TTL', cast=int, default=3600),
+            score_cache=LocalCache(config('SCORE_CACHE_SIZE', cast=int, default=10000), score_cache_ttl),
+            score_cache_ttl=score_cache_ttl,
+            score_batch_size=config('SCORE_BATCH_SIZE', cast=int, default=5),
+            stream=config('SCORE_STREAM', cast=bool, default=True),
+        )
+
+        # Without an in-process cache, values written here reach the API through Redis only.
+        self.bittensor = bittensor_from_config(local_cache_size=0)
+
+        self.wallet = await asyncio.to_thread(load_wallet)
+
+    async def _close(self):
+        await asyncio.gather(
+            self.analyser.close(),
+            self.bittensor.close(),
+            self.reset_subtensor(),
+            return_exceptions=True,
+        )
+        await self.redis.close()
+        await self.redis.connection_pool.disconnect()
+
+
+def load_wallet() -> Wallet:
+    """Load the app wallet, regenerating its coldkey from the mnemonic if missing, and unlock it."""
+    wallet = Wallet(name='app_wallet')
+    if wallet.coldkey_file.data is None:
+        wallet = wallet.regenerate_coldkey(mnemonic=config('WALLET_MNEMONIC'), use_password=False,
+                                           suppress=True, overwrite=False)
+    wallet.unlock_coldkey()
+    return wallet
+
+
+runtime = WorkerRuntime()
@@ -1,57 +1,136 @@
-import asyncio
 import logging
 import math
-from datetime import datetime
+from datetime import datetime, timezone
 
-from bittensor.core.async_subtensor import AsyncSubtensor, Balance
-from bittensor_wallet import Wallet
+from bittensor.core.async_subtensor import Balance
 from celery import Celery
-from decouple import config
+from celery.signals import worker_init, worker_process_init, worker_process_shutdown, worker_shutdown
+from decouple import Csv, config
+from prometheus_client import start_http_server
 
-from services.sentiment_analysis import SentimentAnalyser
+from db.db import store_dividend_snapshots
+from services import metrics
+from services.metrics import TASK_STAGE_DURATION
+from tasks.runtime import runtime
 
 logger = logging.getLogger(__name__)
 app = Celery("tasks", broker=f"{config('REDIS_HOST')}/0")
+app.conf.beat_schedule = {
+    'prefetch-dividends': {
+        'task': 'tasks.task.prefetch_dividends',
+        'schedule': config('PREFETCH_INTERVAL', cast=int, default=60),
+    },
+}
+if config('SNAPSHOT_INTERVAL', cast=int, default=360):
+    app.conf.beat_schedule['snapshot-dividends'] = {
+        'task': 'tasks.task.snapshot_dividends',
+        'schedule': config('SNAPSHOT_INTERVAL', cast=int, default=360),
+    }
+
+
+@worker_init.connect
+def start_metrics_server(**kwargs):
+    port = config('WORKER_METRICS_PORT', cast=int, default=0)
+    if port:
+        start_http_server(port, registry=metrics.registry())
+
+
+@worker_process_init.connect
+def start_runtime(**kwargs):
+    try:
+        runtime.start()
+    except Exception as e:
+        logger.error(f'Failed to start worker runtime, retrying on first task: {e}')
+
+
+@worker_process_shutdown.connect
+@worker_shutdown.connect
+def stop_runtime(**kwargs):
+    runtime.stop()
 
 
 @app.task
-def background_task(netuid: int, hotkey: str):
+def background_task(netuid: int, hotkey: str | None = None):
+    """Trade on the sentiment of a subnet for every hotkey pending for it (and `hotkey`, if given)."""
     async def process():
         logger.info("Background task starting...")
 
         start = datetime.now()
-        analyser = SentimentAnalyser(
-            datura_api_key=config('DATURA_API_KEY'),
-            tweet_days_range=config('TWEET_DAYS_RANGE', cast=int, default=10),
-            tweet_limit=config('TWEET_LIMIT', cast=int, default=10),
-            chutest_api_key=config('CHUTES_API_TOKEN'),
-            chutest_max_concurrent=config('CHUTES_MAX_CONCURRENT', cast=int, default=5),
-        )
-
-        score = await analyser.get_sentiment(netuid)
+        score = await runtime.analyser.get_sentiment(netuid)
         logger.info(f'Sentiment score: {score}, elapsed time: {datetime.now() - start}')
 
+        # Taken after the analysis, so hotkeys requested in the meantime share its result.
+        hotkeys = await runtime.trades.take_pending(netuid)
+        if hotkey is not None and hotkey not in hotkeys:
+            hotkeys.append(hotkey)
+
         if score is None:
             return
 
-        async with AsyncSubtensor(network=config('NETWORK')) as subtensor:
-            wallet = Wallet(name='app_wallet')
-            if wallet.coldkey_file.data is None:
-                wallet = wallet.regenerate_coldkey(mnemonic=config('WALLET_MNEMONIC'), use_password=False,
-                                                   suppress=True, overwrite=False)
+        amount = Balance.from_tao(0.01 * math.fabs(score))
+
+        with TASK_STAGE_DURATION.labels("staking").time():
+            await stake(score, amount, hotkeys)
 
-            amount = Balance.from_tao(0.01 * math.fabs(score))
+        logger.info("Background task completed.")
 
+    async def stake(score: float, amount: Balance, hotkeys: list[str]):
+        for hotkey_ss58 in hotkeys:
             try:
+                subtensor = await runtime.get_subtensor()
                 if score > 0:
-                    result = await subtensor.add_stake(wallet, hotkey_ss58=hotkey, netuid=netuid, amount=amount)
-                    logger.info(f'add_stake hotkey: {hotkey}, netuid: {netuid}, amount: {amount}, result: {result}')
+                    result = await subtensor.add_stake(runtime.wallet, hotkey_ss58=hotkey_ss58, netuid=netuid,
+                                                       amount=amount)
+                    logger.info(f'add_stake hotkey: {hotkey_ss58}, netuid: {netuid}, amount: {amount}, '
+                                f'result: {result}')
                 elif score < 0:
-                    result = await subtensor.unstake(wallet, hotkey_ss58=hotkey, netuid=netuid, amount=amount)
-                    logger.info(f'unstake hotkey: {hotkey}, netuid: {netuid}, amount: {amount}, result: {result}')
+                    result = await subtensor.unstake(runtime.wallet, hotkey_ss58=hotkey_ss58, netuid=netuid,
+                                                     amount=amount)
+                    logger.info(f'unstake hotkey: {hotkey_ss58}, netuid: {netuid}, amount: {amount}, '
+                                f'result: {result}')
             except Exception as e:
                 logger.error(f'Stake/unstake failed due to error: {e}')
+                await runtime.reset_subtensor()
 
-        logger.info("Background task completed.")
+    runtime.run(process())
+
+
+@app.task
+def prefetch_dividends():
+    async def process():
+        start = datetime.now()
+        netuids = list(dict.fromkeys([config('DEFAULT_NETUID', cast=int),
+                                      *config('PREFETCH_NETUIDS', cast=Csv(int), default='')]))
+        with TASK_STAGE_DURATION.labels("prefetch").time():
+            counts = await runtime.bittensor.prefetch_subnets(netuids)
+        logger.info(f'Prefetched dividends: {counts}, elapsed time: {datetime.now() - start}')
+
+    runtime.run(process())
+
+
+@app.task
+def snapshot_dividends():
+    """Record the dividends of every hotkey of the snapshotted subnets at the current block."""
+    async def process():
+        start = datetime.now()
+        # Defaults to the prefetched subnets.
+        netuids = list(dict.fromkeys(config('SNAPSHOT_NETUIDS', cast=Csv(int), default='') or [
+            config('DEFAULT_NETUID', cast=int), *config('PREFETCH_NETUIDS', cast=Csv(int), default='')]))
+        with TASK_STAGE_DURATION.labels("snapshot").time():
+            block, subnets = await runtime.bittensor.snapshot_subnets(netuids)
+            if block is None:
+                logger.error('Dividend snapshot skipped, failed to read the current block.')
+                return
+
+            timestamp = datetime.now(timezone.utc)
+            snapshots = [
+                {"netuid": netuid, "hotkey": hotkey, "block": block, "dividend": dividend, "timestamp": timestamp}
+                for netuid, dividends in subnets.items() if dividends is not None
+                for hotkey, dividend in dividends.items()
+            ]
+            inserted = await store_dividend_snapshots(snapshots, config('SNAPSHOT_BATCH_SIZE', cast=int, default=1000))
+        failed = [netuid for netuid, dividends in subnets.items() if dividends is None]
+        logger.info(f'Snapshot of block {block}: {inserted} rows, failed netuids: {failed}, '
+                    f'elapsed time: {datetime.now() - start}')
 
-    asyncio.run(process())
+    runtime.run(process())
@@ -0,0 +1,15 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+
+@pytest.fixture
+def mock_redis() -> (AsyncMock, MagicMock):
+    """
+    Build a Redis client mock whose pipelines buffer commands and are executed with `execute`.
+    """
+    redis = AsyncMock()
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    redis.pipeline = MagicMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+    return redis, pipe
@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import MagicMock
+
+from benchmarks.fakes import FakeRedis
+from services.trade_scheduler import TradeScheduler
+
+
+@pytest.mark.asyncio
+async def test_fake_redis_coalesces_trades():
+    """
+    Test that the benchmark Redis stand-in supports the commands and pipelines the trade scheduler uses.
+    """
+    # Arrange
+    scheduler = TradeScheduler(60)
+    scheduler.redis = FakeRedis()
+    enqueue = MagicMock()
+
+    # Act
+    first = await scheduler.schedule(18, "hotkey1", enqueue)
+    repeated = await scheduler.schedule(18, "hotkey1", enqueue)
+    other = await scheduler.schedule(18, "hotkey2", enqueue)
+    pending = await scheduler.take_pending(18)
+
+    # Assert
+    assert first and other and not repeated
+    enqueue.assert_called_once_with(18, "hotkey1")
+    assert pending == ["hotkey1", "hotkey2"]
+    assert await scheduler.take_pending(18) == []
+
+
+def test_compare_flags_regressions(mocker):
+    """
+    Test that benchmark results are compared with a baseline within the given tolerance.
+    """
+    # Arrange
+    mocker.patch.dict("os.environ")  # Keep the benchmark's environment defaults out of other tests
+    from benchmarks.run import compare
+    baseline = {"scenarios": {"api_warm_cache": {"p50": 0.01, "p95": 0.02, "p99": 0.03, "throughput": 1000,
+                                                 "error_rate": 0.0}}}
+    results = {"scenarios": {"api_warm_cache": {"p50": 0.011, "p95": 0.03, "p99": 0.03, "throughput": 950,
+                                                "error_rate": 0.0}}}
+
+    # Act
+    regressions = compare(results, baseline, 0.2)
+
+    # Assert
+    assert len(regressions) == 1
+    assert regressions[0].startswith("api_warm_cache: p95")
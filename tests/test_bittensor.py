@@ -1,6 +1,17 @@
+import asyncio
+import time
+
+import lupa
 import pytest
-from unittest.mock import AsyncMock, patch
-from services.bittensor import Bittensor
+from prometheus_client import REGISTRY
+from unittest.mock import AsyncMock, MagicMock, patch
+from services.bittensor import PRUNE_HASH_SCRIPT, Bittensor, CacheHandler, CachedDividend, ChainHandler, DividendLookup, \
+    SubstratePool, bittensor_from_config, chain_deadline
+from services.circuit_breaker import CircuitBreaker
+
+
+def fetches(outcome: str) -> float:
+    return REGISTRY.get_sample_value("dividend_fetches_total", {"outcome": outcome}) or 0
 
 
 @pytest.mark.asyncio
@@ -10,7 +21,7 @@ async def test_get_dividends_cache_hit(mocker):
     """
     # Arrange
     cache = AsyncMock()
-    cache.get_dividend.return_value = 100  # Simulate cache hit
+    cache.get_dividend.return_value = CachedDividend(100)  # Simulate cache hit
 
     chain = AsyncMock()
     chain.get_dividend.return_value = None  # Chain should not be consulted
@@ -117,3 +128,605 @@ async def test_store_dividend_called_on_chain_hit(mocker):
 
     # Assert
     cache.store_dividend.assert_called_once_with(4, "key999", 300)  # Dividend stored
+
+
+@pytest.mark.asyncio
+async def test_substrate_pool_reuses_connection(mocker):
+    """
+    Test that the pool keeps a connection open across queries.
+    """
+    # Arrange
+    substrate_cls = mocker.patch("services.bittensor.AsyncSubstrateInterface", return_value=AsyncMock())
+    pool = SubstratePool('ws://chain', size=1)
+
+    # Act
+    async with pool.connection():
+        pass
+    async with pool.connection():
+        pass
+
+    # Assert
+    substrate_cls.assert_called_once()  # Single connection opened
+    substrate_cls.return_value.initialize.assert_called_once()  # Metadata fetched once
+
+
+@pytest.mark.asyncio
+async def test_substrate_pool_reconnects_after_failure(mocker):
+    """
+    Test that a connection that failed a query is replaced on next use.
+    """
+    # Arrange
+    first, second = AsyncMock(), AsyncMock()
+    substrate_cls = mocker.patch("services.bittensor.AsyncSubstrateInterface", side_effect=[first, second])
+    pool = SubstratePool('ws://chain', size=1)
+
+    # Act
+    with pytest.raises(ConnectionError):
+        async with pool.connection():
+            raise ConnectionError("socket closed")
+
+    async with pool.connection() as substrate:
+        pass
+
+    # Assert
+    assert substrate is second  # Fresh connection used
+    first.close.assert_called_once()  # Broken connection closed
+    assert substrate_cls.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_chain_retries_back_off_until_deadline(mocker):
+    """
+    Test that failed chain queries are retried with growing delays but not past the request deadline.
+    """
+    # Arrange
+    substrate = AsyncMock()
+    substrate.query.side_effect = ConnectionError("socket closed")
+    mocker.patch("services.bittensor.AsyncSubstrateInterface", return_value=substrate)
+    mocker.patch("services.bittensor.random.uniform", side_effect=lambda low, high: high)  # No jitter
+    sleep = mocker.patch("services.bittensor.asyncio.sleep", new_callable=AsyncMock)
+    chain = ChainHandler('ws://chain', 1, 5, backoff_base=1, backoff_max=10)
+    chain_deadline.set(time.monotonic() + 3.5)
+
+    # Act
+    result = await chain.get_dividend(1, "key123")
+
+    # Assert
+    assert result is None
+    assert [call.args[0] for call in sleep.call_args_list] == [1, 2]  # Next delay of 4s would pass the deadline
+    assert substrate.query.call_count == 3
+
+
+@pytest.mark.asyncio
+async def test_open_circuit_fails_fast(mocker):
+    """
+    Test that chain queries are not attempted while the circuit breaker is open.
+    """
+    # Arrange
+    substrate_cls = mocker.patch("services.bittensor.AsyncSubstrateInterface")
+    breaker = CircuitBreaker(error_threshold=1, window=1, min_calls=1)
+    breaker.record_failure()  # Chain considered down
+    chain = ChainHandler('ws://chain', 1, 5, breaker=breaker)
+
+    # Act
+    result = await chain.get_dividend(1, "key123")
+
+    # Assert
+    assert result is None
+    substrate_cls.assert_not_called()  # No connection attempted
+    assert breaker.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_chain_routes_to_fastest_endpoint_and_fails_over(mocker):
+    """
+    Test that queries go to the endpoint with the lowest latency and retries to another endpoint.
+    """
+    # Arrange
+    substrates = {"ws://slow": AsyncMock(), "ws://fast": AsyncMock()}
+    substrates["ws://fast"].query.side_effect = [MagicMock(value=1), ConnectionError("socket closed")]
+    substrates["ws://slow"].query.return_value = MagicMock(value=2)
+    mocker.patch("services.bittensor.AsyncSubstrateInterface", side_effect=lambda url, **kwargs: substrates[url])
+    mocker.patch("services.bittensor.asyncio.sleep", new_callable=AsyncMock)
+    chain = ChainHandler(["ws://slow", "ws://fast"], 1, 3)
+    chain.endpoints[0].latency, chain.endpoints[1].latency = 0.5, 0.1
+
+    # Act
+    first = await chain.get_dividend(1, "key123")
+    second = await chain.get_dividend(1, "key123")
+
+    # Assert
+    assert first == 1  # Served by the fastest endpoint
+    assert second == 2  # Retried on the other endpoint after a failure
+    substrates["ws://slow"].query.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_slow_query_hedged_on_second_endpoint(mocker):
+    """
+    Test that a query slower than the endpoint's p95 latency is duplicated and the first result wins.
+    """
+    # Arrange
+    async def slow_query(*args, **kwargs):
+        await asyncio.sleep(1)
+        return MagicMock(value=1)
+
+    substrates = {"ws://primary": AsyncMock(), "ws://secondary": AsyncMock()}
+    substrates["ws://primary"].query.side_effect = slow_query
+    substrates["ws://secondary"].query.return_value = MagicMock(value=2)
+    mocker.patch("services.bittensor.AsyncSubstrateInterface", side_effect=lambda url, **kwargs: substrates[url])
+    chain = ChainHandler(["ws://primary", "ws://secondary"], 1, 1, hedge=True)
+    chain.endpoints[0].latency, chain.endpoints[1].latency = 0.01, 0.02
+    chain.endpoints[0]._latencies.extend([0.01] * 20)  # p95 of 10ms
+
+    # Act
+    start = time.monotonic()
+    result = await chain.get_dividend(1, "key123")
+
+    # Assert
+    assert result == 2  # Hedged query answered first
+    assert time.monotonic() - start < 0.5
+    assert chain.hedged == 1
+
+
+@pytest.mark.asyncio
+async def test_bulk_query_not_hedged_nor_sampled(mocker):
+    """
+    Test that a batch query is neither hedged nor counted in the endpoint latency samples.
+    """
+    # Arrange
+    async def slow_query_multi(*args, **kwargs):
+        await asyncio.sleep(0.1)
+        return [(storage_key, 5) for storage_key in args[0]]
+
+    substrates = {"ws://primary": AsyncMock(), "ws://secondary": AsyncMock()}
+    substrates["ws://primary"].create_storage_key.side_effect = lambda *args: MagicMock(to_hex=lambda: str(args[2]))
+    substrates["ws://primary"].query_multi.side_effect = slow_query_multi
+    mocker.patch("services.bittensor.AsyncSubstrateInterface", side_effect=lambda url, **kwargs: substrates[url])
+    chain = ChainHandler(["ws://primary", "ws://secondary"], 1, 1, hedge=True)
+    chain.endpoints[0].latency, chain.endpoints[1].latency = 0.01, 0.02
+    chain.endpoints[0]._latencies.extend([0.01] * 20)  # p95 of 10ms
+
+    # Act
+    result = await chain.get_dividends([(1, "key123"), (1, "key456")])
+
+    # Assert
+    assert result == {(1, "key123"): 5, (1, "key456"): 5}
+    assert chain.hedged == 0
+    substrates["ws://secondary"].query_multi.assert_not_called()
+    assert chain.endpoints[0].latency == 0.01  # EWMA untouched by the slow batch
+    assert len(chain.endpoints[0]._latencies) == 20
+
+
+@pytest.mark.asyncio
+async def test_cache_handler_shares_connection_pool(mocker, mock_redis):
+    """
+    Test that cache operations reuse a single Redis client and close its pool.
+    """
+    # Arrange
+    pool_cls = mocker.patch("services.bittensor.aioredis.BlockingConnectionPool")
+    redis, pipe = mock_redis
+    redis.get.return_value = "42"
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60, max_connections=7)
+
+    # Act
+    await cache.store_dividend(1, "key123", 42)
+    result = await cache.get_dividend(1, "key123")
+    await cache.close()
+
+    # Assert
+    assert result.dividend == 42
+    pool_cls.from_url.assert_called_once_with(
+        'redis://localhost', max_connections=7, timeout=5, decode_responses=True
+    )  # One pool for all operations
+    (key, value), kwargs = pipe.set.call_args
+    assert (key, kwargs) == ("1:key123", {"ex": 60})
+    assert value.startswith("42::")  # Stored with no block and the time of storing
+    redis.connection_pool.disconnect.assert_called_once()  # Pool released on shutdown
+
+
+@pytest.mark.asyncio
+async def test_local_cache_serves_hits_without_redis(mocker, mock_redis):
+    """
+    Test that values read from Redis are served from the in-process cache afterwards.
+    """
+    # Arrange
+    redis, _ = mock_redis
+    redis.get.return_value = "42"
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60, local_cache_size=10)
+
+    # Act
+    first = await cache.get_dividend(1, "key123")
+    second = await cache.get_dividend(1, "key123")
+
+    # Assert
+    assert first == second == CachedDividend(42)
+    redis.get.assert_called_once_with("1:key123")  # Second read served locally
+
+
+@pytest.mark.asyncio
+async def test_store_dividend_publishes_invalidation(mocker, mock_redis):
+    """
+    Test that storing a value with the in-process cache enabled notifies other processes.
+    """
+    # Arrange
+    redis, pipe = mock_redis
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60, local_cache_size=10)
+
+    # Act
+    await cache.store_dividend(1, "key123", 42)
+
+    # Assert
+    pipe.publish.assert_called_once_with(CacheHandler.INVALIDATION_CHANNEL, f"{cache.instance_id} 1:key123")
+    assert cache.local.get("1:key123").dividend == 42  # Stored locally as well
+
+
+@pytest.mark.asyncio
+async def test_store_without_local_cache_publishes_invalidation(mocker, mock_redis):
+    """
+    Test that a writer without an in-process cache, like the worker, still notifies processes that have one.
+    """
+    # Arrange
+    redis, pipe = mock_redis
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60)
+
+    # Act
+    await cache.store_dividends({(1, "key1"): 42, (2, "key2"): 43})
+
+    # Assert
+    pipe.publish.assert_called_once_with(CacheHandler.INVALIDATION_CHANNEL, f"{cache.instance_id} 1:key1 2:key2")
+
+
+@pytest.mark.asyncio
+async def test_concurrent_cache_misses_coalesced(mocker):
+    """
+    Test that concurrent cache misses for the same key share a single chain query.
+    """
+    # Arrange
+    cache = AsyncMock()
+    cache.get_dividend.return_value = None  # Simulate cache miss
+
+    async def slow_chain_query(netuid, hotkey):
+        await asyncio.sleep(0.01)
+        return 500
+
+    chain = AsyncMock()
+    chain.get_dividend.side_effect = slow_chain_query
+
+    mocker.patch("services.bittensor.CacheHandler", return_value=cache)
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+
+    bittensor = Bittensor('', '', 1, 1, 1)
+    executed = fetches("executed")
+    coalesced = fetches("coalesced_in_process")
+
+    # Act
+    results = await asyncio.gather(*[bittensor.get_dividend(netuid=5, hotkey="key555") for _ in range(10)])
+
+    # Assert
+    assert results == [(500, False)] * 10
+    chain.get_dividend.assert_called_once_with(5, "key555")  # Chain queried once
+    cache.store_dividend.assert_called_once_with(5, "key555", 500)
+    assert fetches("executed") == executed + 1
+    assert fetches("coalesced_in_process") == coalesced + 9
+
+
+@pytest.mark.asyncio
+async def test_cache_miss_waits_for_fetch_lock_holder(mocker):
+    """
+    Test that a miss whose fetch lock is held elsewhere waits for the cached value instead of querying the chain.
+    """
+    # Arrange
+    cache = AsyncMock()
+    cache.get_dividend.return_value = None  # Simulate cache miss
+    cache.acquire_lock.return_value = None  # Another worker is fetching
+    cache.wait_for_dividend.return_value = 600  # ... and stores the value
+
+    chain = AsyncMock()
+
+    mocker.patch("services.bittensor.CacheHandler", return_value=cache)
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+
+    bittensor = Bittensor('', '', 1, 1, 1, fetch_lock_timeout=10)
+    coalesced = fetches("coalesced_by_lock")
+
+    # Act
+    result, from_cache = await bittensor.get_dividend(netuid=6, hotkey="key666")
+
+    # Assert
+    assert result == 600
+    assert from_cache is False
+    chain.get_dividend.assert_not_called()  # Chain not accessed
+    assert fetches("coalesced_by_lock") == coalesced + 1
+
+
+@pytest.mark.asyncio
+async def test_get_dividends_batch_fetches_only_misses(mocker):
+    """
+    Test that a batch lookup fetches only cache misses from the chain, in one query, and caches them.
+    """
+    # Arrange
+    cache = AsyncMock()
+    cache.get_dividends.return_value = {(1, "key1"): CachedDividend(100)}  # One cache hit
+
+    chain = AsyncMock()
+    chain.get_dividends.return_value = {(2, "key2"): 200}  # One chain hit, one chain miss
+
+    mocker.patch("services.bittensor.CacheHandler", return_value=cache)
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+
+    bittensor = Bittensor('', '', 1, 1, 1)
+
+    # Act
+    results = await bittensor.get_dividends([(1, "key1"), (2, "key2"), (3, "key3"), (1, "key1")])
+
+    # Assert
+    assert results == {
+        (1, "key1"): DividendLookup(100, True),
+        (2, "key2"): DividendLookup(200, False),
+        (3, "key3"): DividendLookup(None, False),
+    }
+    chain.get_dividends.assert_called_once_with([(2, "key2"), (3, "key3")])  # Misses fetched together
+    cache.store_dividends.assert_called_once_with({(2, "key2"): 200})  # Written back in one call
+
+
+@pytest.mark.asyncio
+async def test_prefetch_subnet_caches_all_hotkeys(mocker):
+    """
+    Test that a subnet prefetch stores every hotkey returned by the storage map query.
+    """
+    # Arrange
+    cache = AsyncMock()
+    chain = AsyncMock()
+    chain.get_subnet_dividends.return_value = {"key1": 100, "key2": 200}
+
+    mocker.patch("services.bittensor.CacheHandler", return_value=cache)
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+
+    bittensor = Bittensor('', '', 1, 1, 1)
+
+    # Act
+    count = await bittensor.prefetch_subnet(7)
+
+    # Assert
+    assert count == 2
+    chain.get_subnet_dividends.assert_called_once_with(7)
+    cache.store_dividends.assert_called_once_with({(7, "key1"): 100, (7, "key2"): 200})
+    cache.release_lock.assert_called_once_with(cache.acquire_lock.return_value)  # Lock released
+
+
+@pytest.mark.asyncio
+async def test_snapshot_reads_all_subnets_at_one_block(mocker):
+    """
+    Test that a snapshot reads every subnet at the current block, keeping values of subnets read successfully.
+    """
+    # Arrange
+    chain = AsyncMock()
+    chain.get_block_number.return_value = 1234
+    chain.get_subnet_dividends.side_effect = lambda netuid, block: {"key1": 100} if netuid == 7 else None
+
+    mocker.patch("services.bittensor.CacheHandler", return_value=AsyncMock())
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+
+    bittensor = Bittensor('', '', 1, 1, 1)
+
+    # Act
+    block, subnets = await bittensor.snapshot_subnets([7, 8])
+
+    # Assert
+    assert block == 1234
+    assert subnets == {7: {"key1": 100}, 8: None}
+    chain.get_subnet_dividends.assert_any_call(8, 1234)
+
+
+@pytest.mark.asyncio
+async def test_prefetch_subnet_skipped_when_running_elsewhere(mocker):
+    """
+    Test that a subnet prefetch is skipped when another process holds its lock.
+    """
+    # Arrange
+    cache = AsyncMock()
+    cache.acquire_lock.return_value = None  # Prefetch running in another worker
+    chain = AsyncMock()
+
+    mocker.patch("services.bittensor.CacheHandler", return_value=cache)
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+
+    bittensor = Bittensor('', '', 1, 1, 1)
+
+    # Act
+    count = await bittensor.prefetch_subnet(7)
+
+    # Assert
+    assert count is None
+    chain.get_subnet_dividends.assert_not_called()  # Chain not accessed
+
+
+@pytest.mark.asyncio
+async def test_hot_keys_flushed_to_sorted_set(mocker, mock_redis):
+    """
+    Test that looked up keys are recorded and merged into the hot key set on flush.
+    """
+    # Arrange
+    redis, pipe = mock_redis
+    redis.get.return_value = "42:1000"  # Value tagged with block number
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60, track_hot_keys=True)
+
+    # Act
+    result = await cache.get_dividend(1, "key123")
+    await cache.flush_hot_keys(600)
+
+    # Assert
+    assert result == CachedDividend(42, 1000)
+    (name, accessed), _ = pipe.zadd.call_args
+    assert name == CacheHandler.HOT_KEYS
+    assert list(accessed) == ["1:key123"]
+    pipe.zremrangebyscore.assert_called_once()  # Stale keys trimmed
+
+
+@pytest.mark.asyncio
+async def test_stale_value_served_and_refreshed_in_background(mocker):
+    """
+    Test that a value past its TTL is returned immediately, flagged stale, and refreshed in the background.
+    """
+    # Arrange
+    cache = AsyncMock()
+    cache.get_dividend.return_value = CachedDividend(100, 1000, time.time() - 90)  # Older than the 60s TTL
+
+    chain = AsyncMock()
+    chain.get_dividend.return_value = 110
+
+    mocker.patch("services.bittensor.CacheHandler", return_value=cache)
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+
+    bittensor = Bittensor('', '', 60, 1, 1, redis_stale_ttl=600)
+
+    # Act
+    lookup = await bittensor.lookup_dividend(netuid=8, hotkey="key888")
+    await asyncio.gather(*bittensor._background)  # Let the refresh finish
+
+    # Assert
+    assert (lookup.dividend, lookup.cached, lookup.stale, lookup.block) == (100, True, True, 1000)
+    assert lookup.age >= 90
+    chain.get_dividend.assert_called_once_with(8, "key888")  # Refreshed in the background
+    cache.store_dividend.assert_called_once_with(8, "key888", 110)
+
+
+@pytest.mark.asyncio
+async def test_hash_layout_groups_keys_by_subnet(mocker, mock_redis):
+    """
+    Test that the hash layout writes and reads one Redis hash per subnet, ignoring expired fields.
+    """
+    # Arrange
+    redis, pipe = mock_redis
+    redis.register_script = MagicMock(return_value=AsyncMock())
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60, layout=CacheHandler.HASH)
+    expired = f"7::{time.time() - 61:.3f}"
+    pipe.execute.side_effect = [None, [["42::", expired], ["43::"]]]
+
+    # Act
+    await cache.store_dividends({(1, "key1"): 42, (1, "key2"): 7, (2, "key1"): 43})
+    entries = await cache.get_dividends([(1, "key1"), (2, "key1"), (1, "key2")])
+
+    # Assert
+    assert [call.args[0] for call in pipe.hset.call_args_list] == ["dividends:1", "dividends:2"]
+    assert set(pipe.hset.call_args_list[0].kwargs["mapping"]) == {"key1", "key2"}  # One write per subnet
+    pipe.expire.assert_any_call("dividends:1", 60)
+    pipe.hmget.assert_any_call("dividends:1", ["key1", "key2"])  # One read per subnet
+    assert entries == {(1, "key1"): CachedDividend(42), (2, "key1"): CachedDividend(43)}  # Expired field ignored
+    redis.mget.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_hash_layout_deletes_expired_fields_on_write(mocker, mock_redis):
+    """
+    Test that writing to a subnet hash deletes its fields stored longer than the TTL ago.
+    """
+    # Arrange
+    now = time.time()
+    fields = {"old": f"7:100:{now - 61:.3f}", "recent": f"8:101:{now - 30:.3f}"}
+
+    def call(command, key, *args):
+        if command == "HGETALL":
+            return lua.table(*[item for field in fields.items() for item in field])
+        for field in args:
+            fields.pop(field, None)
+
+    lua = lupa.LuaRuntime()
+    lua.execute("unpack = unpack or table.unpack")  # Redis runs Lua 5.1
+    prune = lua.eval(f"function(redis, KEYS, ARGV) {PRUNE_HASH_SCRIPT} end")
+    redis, pipe = mock_redis
+    script = AsyncMock(side_effect=lambda keys, args, client: prune(
+        lua.table(call=lambda command, *rest: call(command, *rest)), lua.table(*keys), lua.table(*args)))
+    redis.register_script = MagicMock(return_value=script)
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60, layout=CacheHandler.HASH)
+
+    # Act
+    await cache.store_dividends({(1, "new"): 9})
+
+    # Assert
+    assert script.call_args.kwargs["keys"] == ["dividends:1"]
+    assert script.call_args.kwargs["client"] is pipe  # Pruned in the write's round-trip
+    assert set(fields) == {"recent"}  # Expired field deleted
+
+
+@pytest.mark.asyncio
+async def test_hash_layout_prunes_subnet_once_per_ttl(mocker, mock_redis):
+    """
+    Test that a subnet hash is pruned on the first write only until the TTL has passed.
+    """
+    # Arrange
+    redis, pipe = mock_redis
+    script = AsyncMock()
+    redis.register_script = MagicMock(return_value=script)
+    mocker.patch("services.bittensor.aioredis.Redis", return_value=redis)
+    cache = CacheHandler('redis://localhost', 60, layout=CacheHandler.HASH)
+    now = time.time()
+    clock = mocker.patch("services.bittensor.time.time", return_value=now)
+
+    # Act
+    await cache.store_dividends({(1, "key1"): 9, (2, "key1"): 8})
+    await cache.store_dividends({(1, "key2"): 7})
+    clock.return_value = now + 60
+    await cache.store_dividends({(1, "key3"): 6})
+
+    # Assert
+    assert [call.kwargs["keys"] for call in script.call_args_list] == [["dividends:1"], ["dividends:2"],
+                                                                        ["dividends:1"]]
+    assert pipe.hset.call_count == 4  # Every write still stored
+
+
+@pytest.mark.asyncio
+async def test_substrate_pool_tracks_queue(mocker):
+    """
+    Test that queries waiting for a pooled connection are counted along with the longest wait.
+    """
+    # Arrange
+    mocker.patch("services.bittensor.AsyncSubstrateInterface", return_value=AsyncMock())
+    pool = SubstratePool('ws://chain', 1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with pool.connection():
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+
+    # Act
+    waiters = [asyncio.create_task(hold()) for _ in range(2)]
+    await asyncio.sleep(0.05)
+    waiting, delay = pool.waiting, pool.queue_delay()
+    release.set()
+    await asyncio.gather(holder, *waiters)
+
+    # Assert
+    assert waiting == 2
+    assert delay >= 0.05
+    assert pool.waiting == 0 and pool.queue_delay() == 0
+
+
+def test_bittensor_from_config_keeps_stale_values(mocker):
+    """
+    Test that the service built from the environment keeps values in Redis for the stale TTL, with overrides applied.
+    """
+    # Arrange
+    mocker.patch.dict("os.environ", {"CHAIN_URL": "wss://a,wss://b", "REDIS_HOST": "redis://localhost:6379",
+                                     "REDIS_TTL": "120", "REDIS_STALE_TTL": "600", "CHAIN_MAX_CONCURRENT": "5",
+                                     "MAX_RETRIES": "5"})
+
+    # Act
+    bittensor = bittensor_from_config(local_cache_size=0)
+
+    # Assert
+    assert bittensor.redis_ttl == 120
+    assert bittensor.cache.redis_ttl == 600  # Written values outlive the fresh TTL
+    assert bittensor.cache.local is None
+    assert len(bittensor.chain.endpoints) == 2
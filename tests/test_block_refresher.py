@@ -0,0 +1,71 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.block_refresher import BlockRefresher
+
+
+@pytest.mark.asyncio
+async def test_refresh_rereads_hot_keys_at_block():
+    """
+    Test that a new block re-reads the hot keys at that block and stores them tagged with it.
+    """
+    # Arrange
+    bittensor = MagicMock()
+    bittensor.cache = AsyncMock()
+    bittensor.cache.get_hot_keys.return_value = [(1, "key1"), (2, "key2")]
+    bittensor.chain = AsyncMock()
+    bittensor.chain.get_dividends.return_value = {(1, "key1"): 100, (2, "key2"): 200}
+
+    refresher = BlockRefresher(bittensor, 'ws://chain', max_keys_per_block=2, hot_key_window=600)
+
+    # Act
+    await refresher._refresh(1234)
+
+    # Assert
+    bittensor.cache.get_hot_keys.assert_called_once_with(2)  # Bounded by keys per block
+    bittensor.chain.get_dividends.assert_called_once_with([(1, "key1"), (2, "key2")], 1234)
+    bittensor.cache.store_dividends.assert_called_once_with({(1, "key1"): 100, (2, "key2"): 200}, 1234)
+
+
+@pytest.mark.asyncio
+async def test_refresh_skipped_without_hot_keys():
+    """
+    Test that nothing is queried when no key was requested recently.
+    """
+    # Arrange
+    bittensor = MagicMock()
+    bittensor.cache = AsyncMock()
+    bittensor.cache.get_hot_keys.return_value = []
+    bittensor.chain = AsyncMock()
+
+    refresher = BlockRefresher(bittensor, 'ws://chain', max_keys_per_block=2, hot_key_window=600)
+
+    # Act
+    await refresher._refresh(1234)
+
+    # Assert
+    bittensor.chain.get_dividends.assert_not_called()  # Chain not accessed
+
+
+@pytest.mark.asyncio
+async def test_refresh_publishes_watched_keys():
+    """
+    Test that keys watched by streaming clients are re-read with the hot keys and their values published.
+    """
+    # Arrange
+    bittensor = MagicMock()
+    bittensor.cache = AsyncMock()
+    bittensor.cache.get_hot_keys.return_value = [(1, "key1")]
+    bittensor.cache.get_watched_keys.return_value = [(1, "key1"), (2, "key2")]
+    bittensor.chain = AsyncMock()
+    bittensor.chain.get_dividends.return_value = {(1, "key1"): 100, (2, "key2"): 200}
+
+    refresher = BlockRefresher(bittensor, 'ws://chain', max_keys_per_block=2, hot_key_window=600,
+                               max_watched_keys=10)
+
+    # Act
+    await refresher._refresh(1234)
+
+    # Assert
+    bittensor.chain.get_dividends.assert_called_once_with([(1, "key1"), (2, "key2")], 1234)  # Read once
+    bittensor.cache.publish_updates.assert_called_once_with({(1, "key1"): 100, (2, "key2"): 200}, 1234)
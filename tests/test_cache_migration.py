@@ -0,0 +1,37 @@
+import time
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.cache_migration import migrate_keys_to_hashes
+
+
+@pytest.mark.asyncio
+async def test_keys_moved_into_subnet_hashes():
+    """
+    Test that cached values are copied into their subnet hash without overwriting newer values, then deleted.
+    """
+    # Arrange
+    async def scan_iter(**kwargs):
+        for key in ["1:key1", "2:key2", "12abc:other"]:
+            yield key
+
+    redis = AsyncMock()
+    redis.scan_iter = scan_iter
+    pipe = MagicMock()
+    pipe.execute = AsyncMock(side_effect=[["42:100:1700000000.000", 30000, "7", 50000], None])
+    redis.pipeline = MagicMock()
+    redis.pipeline.return_value.__aenter__.return_value = pipe
+
+    # Act
+    migrated = await migrate_keys_to_hashes(redis, 60)
+
+    # Assert
+    assert migrated == 2
+    pipe.hsetnx.assert_any_call("dividends:1", "key1", "42:100:1700000000.000")
+    (name, hotkey, value), _ = pipe.hsetnx.call_args_list[1]
+    assert (name, hotkey) == ("dividends:2", "key2")
+    dividend, block, stored_at = value.split(":")
+    assert (dividend, block) == ("7", "")
+    assert float(stored_at) == pytest.approx(time.time() - 10, abs=1)  # Derived from the remaining TTL
+    pipe.delete.assert_called_once_with("1:key1", "2:key2")  # Other keys left alone
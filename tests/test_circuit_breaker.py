@@ -0,0 +1,45 @@
+from services.circuit_breaker import CircuitBreaker
+
+
+def test_opens_when_error_rate_reached(mocker):
+    """
+    Test that the circuit opens once enough recent calls failed and probes after the reset timeout.
+    """
+    # Arrange
+    monotonic = mocker.patch("services.circuit_breaker.time.monotonic", return_value=100)
+    breaker = CircuitBreaker(error_threshold=0.5, reset_timeout=30, window=4, min_calls=4)
+
+    # Act
+    for failed in [False, True, False, True]:
+        breaker.record_failure() if failed else breaker.record_success()
+
+    # Assert
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()  # Failing fast
+    monotonic.return_value = 130
+    assert breaker.allow()  # Probe let through
+    assert not breaker.allow()  # Single probe at a time
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+
+
+def test_probe_result_closes_or_reopens(mocker):
+    """
+    Test that a successful probe closes the circuit and a failed one opens it again.
+    """
+    # Arrange
+    monotonic = mocker.patch("services.circuit_breaker.time.monotonic", return_value=100)
+    breaker = CircuitBreaker(error_threshold=1, reset_timeout=30, window=1, min_calls=1)
+    breaker.record_failure()
+
+    # Act & Assert
+    monotonic.return_value = 130
+    assert breaker.allow()
+    breaker.record_failure()  # Probe failed
+    assert breaker.state == CircuitBreaker.OPEN
+    assert not breaker.allow()
+
+    monotonic.return_value = 160
+    assert breaker.allow()
+    breaker.record_success()  # Probe succeeded
+    assert breaker.state == CircuitBreaker.CLOSED
+    assert breaker.allow()
@@ -0,0 +1,62 @@
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.bittensor import DividendLookup
+from services.dividend_stream import DividendStream
+
+
+def make_stream(max_keys: int = 100) -> DividendStream:
+    bittensor = MagicMock()
+    bittensor.cache = AsyncMock()
+    bittensor.get_dividends = AsyncMock(
+        side_effect=lambda keys: {key: DividendLookup(100, True, block=1234) for key in keys})
+    return DividendStream(bittensor, max_keys=max_keys)
+
+
+@pytest.mark.asyncio
+async def test_subscribe_pushes_current_values_and_watches_keys():
+    """
+    Test that subscribing to keys pushes their current values and marks them as watched.
+    """
+    # Arrange
+    stream = make_stream()
+    subscription = stream.subscribe()
+
+    # Act
+    await stream.add(subscription, [(1, "key1"), (2, "key2")])
+    updates = await subscription.next(0)
+
+    # Assert
+    stream.bittensor.cache.watch_keys.assert_awaited_once_with([(1, "key1"), (2, "key2")], 30)
+    assert updates == [
+        {"netuid": 1, "hotkey": "key1", "dividend": 100, "block": 1234},
+        {"netuid": 2, "hotkey": "key2", "dividend": 100, "block": 1234},
+    ]
+    with pytest.raises(ValueError):
+        await make_stream(max_keys=1).add(subscription, [(1, "key1"), (2, "key2")])  # Too many keys
+
+
+@pytest.mark.asyncio
+async def test_published_updates_fanned_out_once_per_change():
+    """
+    Test that published values reach every subscriber of the key, and unchanged values are skipped.
+    """
+    # Arrange
+    stream = make_stream()
+    first, second, other = stream.subscribe(), stream.subscribe(), stream.subscribe()
+    await stream.add(first, [(1, "key1")])
+    await stream.add(second, [(1, "key1")])
+    await stream.add(other, [(2, "key2")])
+    for subscription in (first, second, other):
+        await subscription.next(0)  # Current values
+
+    # Act
+    stream.dispatch(json.dumps({"block": 1235, "dividends": {"1:key1": 200, "2:key2": 100}}))
+
+    # Assert
+    update = {"netuid": 1, "hotkey": "key1", "dividend": 200, "block": 1235}
+    assert await first.next(0) == [update]
+    assert await second.next(0) == [update]
+    assert await other.next(0) == []  # Value unchanged
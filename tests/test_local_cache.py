@@ -0,0 +1,56 @@
+import time
+
+from services.local_cache import LocalCache
+
+
+def test_local_cache_evicts_least_recently_used():
+    """
+    Test that the oldest unused entry is evicted once the cache is full.
+    """
+    # Arrange
+    cache = LocalCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" becomes least recently used
+
+    # Act
+    cache.set("c", 3)
+
+    # Assert
+    assert cache.get("a") == 1
+    assert cache.get("b") is None  # Evicted
+    assert cache.get("c") == 3
+
+
+def test_local_cache_expires_entries(mocker):
+    """
+    Test that entries are not served past their TTL.
+    """
+    # Arrange
+    now = time.monotonic()
+    clock = mocker.patch("services.local_cache.time.monotonic", return_value=now)
+    cache = LocalCache(max_entries=10, ttl=5)
+    cache.set("a", 1)
+
+    # Act
+    clock.return_value = now + 6
+
+    # Assert
+    assert cache.get("a") is None
+    assert len(cache) == 0  # Expired entry dropped
+
+
+def test_local_cache_bounded_by_size():
+    """
+    Test that entries are evicted to keep the approximate footprint under the limit.
+    """
+    # Arrange
+    cache = LocalCache(max_entries=1000, ttl=60, max_bytes=500)
+
+    # Act
+    for i in range(100):
+        cache.set(f"key{i}", i)
+
+    # Assert
+    assert cache.size_bytes <= 500
+    assert cache.get("key99") == 99  # Most recent entry kept
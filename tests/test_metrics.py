@@ -0,0 +1,73 @@
+import pytest
+from prometheus_client import REGISTRY
+from unittest.mock import AsyncMock
+
+from services import metrics
+from services.bittensor import Bittensor, CachedDividend, ChainHandler
+
+
+def sample(name: str, labels: dict | None = None) -> float:
+    return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+
+@pytest.mark.asyncio
+async def test_cache_lookups_counted(mocker):
+    """
+    Test that dividend lookups are counted by cache result.
+    """
+    # Arrange
+    cache = AsyncMock()
+    cache.get_dividend.side_effect = [CachedDividend(100), None]  # Hit, then miss
+    chain = AsyncMock()
+    chain.get_dividend.return_value = 200
+    mocker.patch("services.bittensor.CacheHandler", return_value=cache)
+    mocker.patch("services.bittensor.ChainHandler", return_value=chain)
+    bittensor = Bittensor('', '', 1, 1, 1)
+    hits = sample("dividend_cache_lookups_total", {"result": "hit"})
+    misses = sample("dividend_cache_lookups_total", {"result": "miss"})
+
+    # Act
+    await bittensor.get_dividend(1, "key123")
+    await bittensor.get_dividend(1, "key456")
+
+    # Assert
+    assert sample("dividend_cache_lookups_total", {"result": "hit"}) == hits + 1
+    assert sample("dividend_cache_lookups_total", {"result": "miss"}) == misses + 1
+
+
+@pytest.mark.asyncio
+async def test_chain_query_latency_and_failures_recorded(mocker):
+    """
+    Test that chain query latency is recorded per endpoint and given up queries are counted.
+    """
+    # Arrange
+    substrate = AsyncMock()
+    substrate.query.side_effect = ConnectionError("socket closed")
+    mocker.patch("services.bittensor.AsyncSubstrateInterface", return_value=substrate)
+    mocker.patch("services.bittensor.asyncio.sleep", new_callable=AsyncMock)
+    chain = ChainHandler('ws://metrics', 1, 2)
+    errors = sample("chain_query_duration_seconds_count", {"endpoint": "ws://metrics", "outcome": "error"})
+    retries = sample("chain_query_retries_total")
+    failures = sample("chain_query_failures_total", {"reason": "exhausted"})
+
+    # Act
+    await chain.get_dividend(1, "key123")
+
+    # Assert
+    assert sample("chain_query_duration_seconds_count", {"endpoint": "ws://metrics", "outcome": "error"}) == errors + 2
+    assert sample("chain_query_retries_total") == retries + 1
+    assert sample("chain_query_failures_total", {"reason": "exhausted"}) == failures + 1
+
+
+def test_empty_multiproc_dir_uses_process_registry(mocker):
+    """
+    Test that an empty PROMETHEUS_MULTIPROC_DIR is treated as unset instead of aggregating from an empty path.
+    """
+    # Arrange
+    mocker.patch.dict("os.environ", {"PROMETHEUS_MULTIPROC_DIR": ""})
+
+    # Act
+    collector_registry = metrics.registry()
+
+    # Assert
+    assert collector_registry is REGISTRY
@@ -0,0 +1,48 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.rate_limiter import RateLimiter
+
+
+@pytest.mark.asyncio
+async def test_bucket_taken_atomically_per_token():
+    """
+    Test that tokens are taken by the server-side script from a bucket per client, returning the retry delay.
+    """
+    # Arrange
+    script = AsyncMock(side_effect=[[1, 0], [0, 1500]])  # Allowed, then empty for 1.5s
+    redis = MagicMock()
+    redis.register_script.return_value = script
+    script.registered_client = redis
+    limiter = RateLimiter(10, 50)
+    limiter.redis = redis
+
+    # Act
+    allowed = await limiter.acquire("token1")
+    limited = await limiter.acquire("token1", cost=100)
+
+    # Assert
+    assert allowed == 0
+    assert limited == 1.5
+    redis.register_script.assert_called_once()  # Registered once per client
+    keys, args = script.call_args.kwargs["keys"], script.call_args.kwargs["args"]
+    assert keys[0].startswith(RateLimiter.REDIS_PREFIX) and "token1" not in keys[0]  # Token not stored in clear
+    assert args == [10, 50, 50]  # Cost capped by the burst
+
+
+@pytest.mark.asyncio
+async def test_requests_allowed_when_redis_unavailable():
+    """
+    Test that the rate limiter lets requests through if Redis fails.
+    """
+    # Arrange
+    redis = MagicMock()
+    redis.register_script.return_value = AsyncMock(side_effect=ConnectionError("Redis down"))
+    limiter = RateLimiter(10, 50)
+    limiter.redis = redis
+
+    # Act
+    retry_after = await limiter.acquire("token1")
+
+    # Assert
+    assert retry_after == 0
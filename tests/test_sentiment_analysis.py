@@ -0,0 +1,199 @@
+import json
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from services.local_cache import LocalCache
+from services.sentiment_analysis import SentimentAnalyser, score_cache_key
+
+
+def make_analyser(redis, **kwargs) -> SentimentAnalyser:
+    return SentimentAnalyser('datura-key', 10, 5, 'chutes-key', 1, redis=redis, tweet_cache_ttl=60,
+                             score_cache=LocalCache(100, 60), score_cache_ttl=3600, **kwargs)
+
+
+@pytest.mark.asyncio
+async def test_cached_tweets_skip_search(mocker):
+    """
+    Test that tweets cached for the netuid and date range are used without calling the search API.
+    """
+    # Arrange
+    datura = mocker.patch("services.sentiment_analysis.Datura")
+    redis = AsyncMock()
+    redis.get.return_value = json.dumps(["tweet 1", "tweet 2"])  # Simulate cache hit
+    analyser = make_analyser(redis)
+
+    # Act
+    tweets = await analyser._get_tweets(18)
+
+    # Assert
+    assert tweets == ["tweet 1", "tweet 2"]
+    datura.return_value.basic_twitter_search.assert_not_called()  # Search not called
+
+
+@pytest.mark.asyncio
+async def test_searched_tweets_cached(mocker):
+    """
+    Test that tweets are searched on a cache miss and cached for the following calls.
+    """
+    # Arrange
+    datura = mocker.patch("services.sentiment_analysis.Datura")
+    datura.return_value.basic_twitter_search = MagicMock(return_value=[{"text": "tweet 1"}])
+    redis = AsyncMock()
+    redis.get.return_value = None  # Simulate cache miss
+    analyser = make_analyser(redis)
+
+    # Act
+    tweets = await analyser._get_tweets(18)
+
+    # Assert
+    assert tweets == ["tweet 1"]
+    datura.return_value.basic_twitter_search.assert_called_once()
+    key, value = redis.set.call_args.args
+    assert key.startswith("tweets:18:")
+    assert json.loads(value) == ["tweet 1"]
+    assert redis.set.call_args.kwargs == {"ex": 60}
+
+
+@pytest.mark.asyncio
+async def test_memoized_score_skips_llm(mocker):
+    """
+    Test that a score memoized for the same tweet is reused without calling the LLM.
+    """
+    # Arrange
+    session = mocker.patch("services.sentiment_analysis.aiohttp.ClientSession")
+    redis = AsyncMock()
+    redis.mget.return_value = ["42"]  # Simulate score memoized by another worker
+    analyser = make_analyser(redis)
+
+    # Act
+    first = await analyser._score_tweets(["tweet 1"], 18)
+    second = await analyser._score_tweets(["tweet 1"], 18)
+
+    # Assert
+    assert first == second == [42]
+    session.assert_not_called()  # LLM not called
+    redis.mget.assert_awaited_once_with([score_cache_key(18, "tweet 1")])  # Second call served locally
+
+
+@pytest.mark.asyncio
+async def test_llm_scores_batched_and_memoized(mocker, mock_redis):
+    """
+    Test that uncached tweets are scored with a single request on a shared session and memoized.
+    """
+    # Arrange
+    response = AsyncMock()
+    response.json.return_value = {"choices": [{"message": {"content": "[-15, null]"}}]}
+    session = MagicMock(closed=False)
+    session.post.return_value.__aenter__.return_value = response
+    client_session = mocker.patch("services.sentiment_analysis.aiohttp.ClientSession", return_value=session)
+    redis, pipe = mock_redis
+    redis.mget.return_value = [None, None]  # Simulate cache miss
+    analyser = make_analyser(redis, score_batch_size=5)
+
+    # Act
+    scores = await analyser._score_tweets(["tweet 1", "tweet 2"], 18)
+    await analyser._score_tweets(["tweet 1", "tweet 2"], 18)
+
+    # Assert
+    assert scores == [-15, None]
+    client_session.assert_called_once()  # Session reused
+    session.post.assert_called_once()  # Both tweets scored in one request
+    pipe.set.assert_any_call(score_cache_key(18, "tweet 1"), "-15", ex=3600)
+    pipe.set.assert_any_call(score_cache_key(18, "tweet 2"), "", ex=3600)
+    assert score_cache_key(18, "tweet 1") != score_cache_key(19, "tweet 1")
+
+
+@pytest.mark.asyncio
+async def test_streamed_score_stops_early(mocker):
+    """
+    Test that a streamed response is no longer read once the score is parsed.
+    """
+    # Arrange
+    chunks = [
+        b'data: {"choices": [{"delta": {"content": "score"}}]}\n',
+        b'data: {"choices": [{"delta": {"content": ": +30"}}]}\n',
+        b'data: {"choices": [{"delta": {"content": " because"}}]}\n',
+        b'data: {"choices": [{"delta": {"content": " of"}}]}\n',
+    ]
+    read = []
+
+    async def content():
+        for chunk in chunks:
+            read.append(chunk)
+            yield chunk
+
+    response = MagicMock()
+    response.content = content()
+    session = MagicMock(closed=False)
+    session.post.return_value.__aenter__.return_value = response
+    mocker.patch("services.sentiment_analysis.aiohttp.ClientSession", return_value=session)
+    analyser = make_analyser(None, stream=True)
+
+    # Act
+    scores = await analyser._score_tweets(["tweet 1"], 18)
+
+    # Assert
+    assert scores == [30]
+    assert session.post.call_args.kwargs["json"]["stream"] is True
+    assert len(read) == 3  # Stopped reading once the score was complete
+    response.close.assert_called_once()  # Generation cancelled
+
+
+@pytest.mark.asyncio
+async def test_streamed_score_split_across_chunks(mocker):
+    """
+    Test that a streamed score is not cut off when its digits arrive in separate chunks.
+    """
+    # Arrange
+    chunks = [
+        b'data: {"choices": [{"delta": {"content": "score: +4"}}]}\n',
+        b'data: {"choices": [{"delta": {"content": "5"}}]}\n',
+        b'data: [DONE]\n',
+    ]
+
+    async def content():
+        for chunk in chunks:
+            yield chunk
+
+    response = MagicMock()
+    response.content = content()
+    session = MagicMock(closed=False)
+    session.post.return_value.__aenter__.return_value = response
+    mocker.patch("services.sentiment_analysis.aiohttp.ClientSession", return_value=session)
+    analyser = make_analyser(None, stream=True)
+
+    # Act
+    scores = await analyser._score_tweets(["tweet 1"], 18)
+
+    # Assert
+    assert scores == [45]
+
+
+@pytest.mark.asyncio
+async def test_single_score_first_match_and_failures_not_memoized(mocker, mock_redis):
+    """
+    Test that a single tweet takes the first score of the reply, and a reply without a score is not memoized.
+    """
+    # Arrange
+    response = AsyncMock()
+    response.json.side_effect = [
+        {"choices": [{"message": {"content": "The score is 40. Final score: 40"}}]},
+        {"choices": [{"message": {"content": "I cannot tell."}}]},
+    ]
+    session = MagicMock(closed=False)
+    session.post.return_value.__aenter__.return_value = response
+    mocker.patch("services.sentiment_analysis.aiohttp.ClientSession", return_value=session)
+    redis, pipe = mock_redis
+    redis.mget.return_value = [None]  # Simulate cache miss
+    analyser = make_analyser(redis)
+
+    # Act
+    scored = await analyser._score_tweets(["tweet 1"], 18)
+    unscored = await analyser._score_tweets(["tweet 2"], 18)
+
+    # Assert
+    assert scored == [40]
+    assert unscored == [None]
+    pipe.set.assert_called_once_with(score_cache_key(18, "tweet 1"), "40", ex=3600)  # Only the score memoized
+    assert analyser.score_cache.get(score_cache_key(18, "tweet 2")) is None
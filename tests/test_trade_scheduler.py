@@ -0,0 +1,52 @@
+import pytest
+from unittest.mock import MagicMock
+
+from services.trade_scheduler import TradeScheduler, pending_key, queued_key, trade_key
+
+
+@pytest.mark.asyncio
+async def test_first_hotkey_enqueues_netuid_task(mock_redis):
+    """
+    Test that the first trade for a netuid enqueues its task and adds the hotkey to the pending set.
+    """
+    # Arrange
+    redis, pipe = mock_redis
+    redis.set.return_value = True  # Not yet scheduled for this hotkey
+    pipe.execute.return_value = [1, True, True]  # No task queued for the netuid
+    scheduler = TradeScheduler(60)
+    scheduler.redis = redis
+    enqueue = MagicMock()
+
+    # Act
+    scheduled = await scheduler.schedule(18, "hotkey1", enqueue)
+
+    # Assert
+    assert scheduled
+    redis.set.assert_awaited_once_with(trade_key(18, "hotkey1"), 1, ex=60, nx=True)
+    pipe.sadd.assert_called_once_with(pending_key(18), "hotkey1")
+    pipe.set.assert_called_once_with(queued_key(18), 1, ex=3600, nx=True)
+    enqueue.assert_called_once_with(18, "hotkey1")
+
+
+@pytest.mark.asyncio
+async def test_trades_join_scheduled_ones(mock_redis):
+    """
+    Test that repeated trades join the scheduled one and new hotkeys join the queued netuid task.
+    """
+    # Arrange
+    redis, pipe = mock_redis
+    redis.set.side_effect = [None, True]  # hotkey1 already scheduled, hotkey2 not
+    pipe.execute.return_value = [1, True, None]  # Task already queued for the netuid
+    scheduler = TradeScheduler(60)
+    scheduler.redis = redis
+    enqueue = MagicMock()
+
+    # Act
+    repeated = await scheduler.schedule(18, "hotkey1", enqueue)
+    other = await scheduler.schedule(18, "hotkey2", enqueue)
+
+    # Assert
+    assert not repeated
+    assert other
+    pipe.sadd.assert_called_once_with(pending_key(18), "hotkey2")
+    enqueue.assert_not_called()  # Fanned out by the queued task
@@ -0,0 +1,106 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, MagicMock
+
+from tasks.runtime import WorkerRuntime
+
+ENV = {
+    "REDIS_HOST": "redis://localhost:6379",
+    "DATURA_API_KEY": "datura-key",
+    "CHUTES_API_TOKEN": "chutes-key",
+    "CHAIN_URL": "wss://localhost:443",
+    "REDIS_TTL": "120",
+    "CHAIN_MAX_CONCURRENT": "5",
+    "MAX_RETRIES": "5",
+    "NETWORK": "test",
+}
+
+
+@pytest.fixture
+def runtime(mocker):
+    mocker.patch.dict("os.environ", ENV)
+    mocker.patch("tasks.runtime.aioredis.from_url", return_value=AsyncMock())
+    mocker.patch("tasks.runtime.bittensor_from_config", return_value=AsyncMock())
+    mocker.patch("tasks.runtime.load_wallet", return_value=MagicMock())
+    runtime = WorkerRuntime()
+    yield runtime
+    runtime.stop()
+
+
+def test_tasks_share_runtime_loop(runtime):
+    """
+    Test that tasks run on one long-lived loop with the state set up once per process.
+    """
+    # Arrange
+    async def current():
+        return asyncio.get_running_loop(), runtime.analyser
+
+    # Act
+    first = runtime.run(current())  # Starts the runtime lazily
+    second = runtime.run(current())
+
+    # Assert
+    assert first == second
+    assert first[0] is runtime.loop
+    assert first[1] is not None
+
+
+def test_subtensor_reused_until_reset(runtime, mocker):
+    """
+    Test that the subtensor connection is opened once and reopened only after a reset.
+    """
+    # Arrange
+    subtensor = mocker.patch("tasks.runtime.AsyncSubtensor", side_effect=lambda **kwargs: AsyncMock())
+
+    # Act
+    first = runtime.run(runtime.get_subtensor())
+    second = runtime.run(runtime.get_subtensor())
+    runtime.run(runtime.reset_subtensor())
+    third = runtime.run(runtime.get_subtensor())
+
+    # Assert
+    assert first is second
+    assert third is not first
+    assert subtensor.call_count == 2
+    first.close.assert_awaited_once()  # Closed by the reset
+
+
+def test_client_enqueues_worker_task_by_name(mocker):
+    """
+    Test that the task client sends tasks under the names the worker registers them with.
+    """
+    # Arrange
+    mocker.patch.dict("os.environ", ENV)
+    from tasks import client
+    from tasks.task import background_task
+    celery_app = mocker.patch.object(client, "celery_app")
+
+    # Act
+    client.enqueue_background_task(18, "hotkey1")
+
+    # Assert
+    assert background_task.name == client.BACKGROUND_TASK
+    celery_app.return_value.send_task.assert_called_once_with(client.BACKGROUND_TASK, args=[18, "hotkey1"])
+
+
+def test_task_trades_scheduling_hotkey_after_pending_set_expired(mocker):
+    """
+    Test that the trade task stakes for the hotkey it was enqueued with when the pending set already expired.
+    """
+    # Arrange
+    mocker.patch.dict("os.environ", ENV)
+    from tasks import task
+    runtime = mocker.patch.object(task, "runtime")
+    runtime.run.side_effect = asyncio.run
+    runtime.analyser.get_sentiment = AsyncMock(return_value=50)
+    runtime.trades.take_pending = AsyncMock(return_value=[])  # Pending set expired
+    subtensor = AsyncMock()
+    runtime.get_subtensor = AsyncMock(return_value=subtensor)
+
+    # Act
+    task.background_task.run(18, "hotkey1")
+
+    # Assert
+    subtensor.add_stake.assert_awaited_once()
+    assert subtensor.add_stake.await_args.kwargs["hotkey_ss58"] == "hotkey1"